@@ -0,0 +1,138 @@
+from collections import defaultdict
+import heapq
+import numpy as np
+
+# Machine statuses that can take work; machines without a status are treated as active
+DISPATCHABLE_STATUSES = (None, "", "Active")
+
+class MachineDispatcher:
+    """
+    Earliest-available dispatch over the parallel machines of each work center.
+
+    Every work center keeps a heap of (available_at, machine_id) and each batch goes to the
+    machine that frees up first. Work centers without a dispatchable machine get one virtual
+    lane keyed by the work center itself, so they are still scheduled; it is named
+    virtual_machine_name, or after the work center when that is None. Times are plain numbers,
+    normally working time of a ShiftCalendar.
+    """
+
+    def __init__(self, machines: dict, available_at: int = 0, virtual_machine_name: str = "N/A"):
+        # machines: {work_center: [(machine_id, machine_name), ...]}
+        self.available_at = available_at
+        self.virtual_machine_name = virtual_machine_name
+        self.machine_names = {}
+        self.machine_work_centers = {}
+        self.busy_time = defaultdict(int)
+        self.end_times = {}
+        self._heaps = {}
+        for work_center, work_center_machines in machines.items():
+            for machine_id, machine_name in work_center_machines:
+                self.machine_names[machine_id] = machine_name
+                self.machine_work_centers[machine_id] = work_center
+            heap = [(available_at, machine_id) for machine_id, _ in work_center_machines]
+            if heap:
+                heapq.heapify(heap)
+                self._heaps[work_center] = heap
+
+    def _heap(self, work_center):
+        heap = self._heaps.get(work_center)
+        if heap is None:
+            lane = ("virtual", work_center)
+            self.machine_names[lane] = (
+                str(work_center) if self.virtual_machine_name is None else self.virtual_machine_name
+            )
+            self.machine_work_centers[lane] = work_center
+            heap = self._heaps[work_center] = [(self.available_at, lane)]
+        return heap
+
+    def restore(self, work_center, available_at: dict):
+        """
+        Reset the machines of work_center to the given {machine_id: available_at}; machines
+        not listed are available from the dispatcher start.
+        """
+        heap = self._heap(work_center)
+        heap[:] = [(available_at.get(machine_id, self.available_at), machine_id) for _, machine_id in heap]
+        heapq.heapify(heap)
+
+    def dispatch(self, work_center, ready_at, duration):
+        """
+        Run a batch of the given duration on the earliest free machine of work_center, no
+        earlier than ready_at. Returns (machine_id, start, end).
+        """
+        heap = self._heap(work_center)
+        available_at, machine_id = heap[0]
+        start = max(ready_at, available_at)
+        end = start + duration
+        heapq.heapreplace(heap, (end, machine_id))
+        self.busy_time[machine_id] += duration
+        self.end_times[machine_id] = end
+        return machine_id, start, end
+
+    def dispatch_batches(self, work_center, ready_at, duration, count, last_duration=None):
+        """
+        Dispatch count batches released together at ready_at, each of the given duration except
+        the last one (last_duration), exactly as count calls to dispatch would.
+
+        Because the batches are alike, machine i starts its j-th batch at
+        max(available_i, ready_at) + j * duration, so the batch starts are the count smallest of
+        those sequences and are found with one sort. Returns machine ids, starts and ends in
+        dispatch order.
+        """
+        last_duration = duration if last_duration is None else last_duration
+        heap = self._heap(work_center)
+        if count <= 0:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        entries = sorted(heap, key=lambda entry: entry[1])
+        stored = np.array([available_at for available_at, _ in entries], dtype=np.int64)
+        available = np.maximum(stored, ready_at)
+
+        rounds = np.arange(count, dtype=np.int64) * duration
+        if len(entries) == 1:
+            machines = np.zeros(count, dtype=np.int64)
+            starts = available[0] + rounds
+        else:
+            candidates = (available[:, None] + rounds[None, :]).ravel()
+            # Ties go to the lower heap entry, i.e. the earlier stored time, then the lower machine id
+            heap_times = candidates.copy()
+            heap_times[::count] = stored
+            machine_ranks = np.repeat(np.arange(len(entries)), count)
+            chosen = np.lexsort((machine_ranks, heap_times, candidates))[:count]
+            machines = machine_ranks[chosen]
+            starts = candidates[chosen]
+
+        durations = np.full(count, duration, dtype=np.int64)
+        durations[-1] = last_duration
+        ends = starts + durations
+
+        machine_ids = [machine_id for _, machine_id in entries]
+        new_heap = []
+        for rank, (available_at, machine_id) in enumerate(entries):
+            assigned = machines == rank
+            if assigned.any():
+                available_at = int(ends[assigned].max())
+                self.busy_time[machine_id] += int(durations[assigned].sum())
+                self.end_times[machine_id] = available_at
+            new_heap.append((available_at, machine_id))
+        heapq.heapify(new_heap)
+        heap[:] = new_heap
+
+        return [machine_ids[rank] for rank in machines.tolist()], starts, ends
+
+    def utilization(self, horizon_end=None) -> dict:
+        """
+        Busy time and utilization per machine between available_at and horizon_end, which
+        defaults to the end of the last batch on any machine.
+        """
+        if horizon_end is None:
+            horizon_end = max(self.end_times.values(), default=self.available_at)
+        span = horizon_end - self.available_at
+        return {
+            machine_id: {
+                "machine": self.machine_names[machine_id],
+                "work_center": self.machine_work_centers[machine_id],
+                "busy_time": self.busy_time[machine_id],
+                "utilization": self.busy_time[machine_id] / span if span > 0 else 0.0,
+            }
+            for machine_id in self.machine_names
+        }
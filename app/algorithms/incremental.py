@@ -0,0 +1,230 @@
+from bisect import bisect_left
+import threading
+import numpy as np
+from app.algorithms.dispatch import MachineDispatcher
+from app.algorithms.plan import (
+    PlanOperation,
+    create_plan,
+    dispatch_operation,
+    dispatch_sequence,
+    schedule_operation_columns,
+    schedule_operation_rows,
+)
+
+class IncrementalScheduler:
+    """
+    Keeps the last plan and replans only what a change to one operation can move.
+
+    Operations are dispatched in a fixed sequence (see dispatch_sequence). A changed operation
+    can only move later operations of its own order, and later operations of work centers whose
+    machine timelines it changed; everything else keeps its previous batches. Replanning walks
+    the sequence from the changed operation and re-dispatches just those operations, rebuilding
+    a work center's machine state from the kept plan when it first becomes affected.
+    """
+
+    def __init__(self, operations, machines, calendar=None, start_time=None):
+        self.machines = machines
+        self.calendar, self.dispatcher = create_plan(machines, calendar, start_time)
+        self.available_at = self.dispatcher.available_at
+        self._lock = threading.Lock()
+
+        self.sequence = dispatch_sequence(operations)
+        self.positions = {op.operation_id: position for position, op in enumerate(self.sequence)}
+        self.batches = []
+        self.ready_times = []
+        ready_at, order_id = self.available_at, None
+        for op in self.sequence:
+            if op.order_id != order_id:
+                ready_at, order_id = self.available_at, op.order_id
+            batches = dispatch_operation(op, ready_at, self.dispatcher)
+            self.batches.append(batches)
+            self.ready_times.append(ready_at)
+            if len(batches.ends):
+                ready_at = int(batches.ends.max())
+
+        self._index_machine_timelines()
+
+    # Picklable, so a plan can be built in a worker process and sent back
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _index_machine_timelines(self):
+        """
+        Per machine, the sequence positions and end times of its batches. A machine only ever
+        gets later, so its availability before a position is the end of its last batch before it.
+        """
+        self._work_center_positions = {}
+        for position, op in enumerate(self.sequence):
+            self._work_center_positions.setdefault(op.work_center_id, []).append(position)
+        self._timelines = {}
+        self._reindex(self._work_center_positions, 0)
+
+    def _reindex(self, work_centers, first_position):
+        """
+        Rebuild the timelines of the machines of work_centers from first_position onwards.
+        """
+        for work_center in work_centers:
+            for machine_id, machine_work_center in self.dispatcher.machine_work_centers.items():
+                if machine_work_center == work_center and machine_id in self._timelines:
+                    positions, ends = self._timelines[machine_id]
+                    del ends[bisect_left(positions, first_position):]
+                    del positions[bisect_left(positions, first_position):]
+
+            work_center_positions = self._work_center_positions[work_center]
+            for position in work_center_positions[bisect_left(work_center_positions, first_position):]:
+                batches = self.batches[position]
+                for machine_id, end in zip(batches.machine_ids, batches.ends.tolist()):
+                    positions, ends = self._timelines.setdefault(machine_id, ([], []))
+                    if positions and positions[-1] == position:
+                        ends[-1] = max(ends[-1], end)
+                    else:
+                        positions.append(position)
+                        ends.append(end)
+
+    def _availability_before(self, work_center, position) -> dict:
+        available_at = {}
+        for machine_id, machine_work_center in self.dispatcher.machine_work_centers.items():
+            if machine_work_center != work_center or machine_id not in self._timelines:
+                continue
+            positions, ends = self._timelines[machine_id]
+            index = bisect_left(positions, position)
+            if index:
+                available_at[machine_id] = ends[index - 1]
+        return available_at
+
+    def update_operation(self, op: PlanOperation) -> list:
+        """
+        Replace one operation and replan what it moves. Returns the ids of the operations
+        whose batches changed. Changes to the order, operation number or work center alter
+        the dispatch sequence itself and need a full rebuild, which raises KeyError here.
+        """
+        with self._lock:
+            position = self.positions[op.operation_id]
+            previous = self.sequence[position]
+            if (op.order_id, op.operation_number, op.work_center_id) != (
+                previous.order_id, previous.operation_number, previous.work_center_id
+            ):
+                raise KeyError(f"Operation {op.operation_id} moved in the dispatch sequence")
+            self.sequence[position] = op
+
+            # Scratch dispatcher holding the machine state of the work centers that have moved
+            live = MachineDispatcher(self.machines, self.available_at)
+            live.machine_names = self.dispatcher.machine_names
+            live_work_centers = set()
+            changed = []
+
+            ready_at = self.ready_times[position]
+            for current in range(position, len(self.sequence)):
+                current_op = self.sequence[current]
+                if current > position and current_op.order_id != self.sequence[current - 1].order_id:
+                    ready_at = self.available_at
+                    if not live_work_centers:
+                        break  # Nothing left that can move
+
+                affected = (
+                    current == position
+                    or current_op.work_center_id in live_work_centers
+                    or ready_at != self.ready_times[current]
+                )
+                if affected:
+                    if current_op.work_center_id not in live_work_centers:
+                        live.restore(
+                            current_op.work_center_id,
+                            self._availability_before(current_op.work_center_id, current)
+                        )
+                    batches = dispatch_operation(current_op, ready_at, live)
+                    old = self.batches[current]
+                    same_times = (
+                        batches.machine_ids == old.machine_ids
+                        and np.array_equal(batches.starts, old.starts)
+                        and np.array_equal(batches.ends, old.ends)
+                    )
+                    if not same_times:
+                        live_work_centers.add(current_op.work_center_id)
+                    # The changed operation can split its quantity differently in the same time
+                    if not (
+                        same_times
+                        and np.array_equal(batches.quantity_starts, old.quantity_starts)
+                        and np.array_equal(batches.quantity_ends, old.quantity_ends)
+                    ):
+                        self.batches[current] = batches
+                        changed.append(current_op.operation_id)
+                    self.ready_times[current] = ready_at
+
+                batches = self.batches[current]
+                if len(batches.ends):
+                    ready_at = int(batches.ends.max())
+
+            self._reindex(live_work_centers, position)
+            return changed
+
+    def utilization(self) -> dict:
+        """
+        Busy time and utilization of every machine over the kept plan, from its start to the end
+        of the last batch, as MachineDispatcher.utilization gives them.
+        """
+        with self._lock:
+            plan = list(zip(self.sequence, self.batches))
+        busy_time = dict.fromkeys(self.dispatcher.machine_names, 0)
+        horizon_end = self.available_at
+        for op, batches in plan:
+            if not len(batches.ends):
+                continue
+            horizon_end = max(horizon_end, int(batches.ends.max()))
+            for machine_id, duration in zip(batches.machine_ids, (batches.ends - batches.starts).tolist()):
+                busy_time[machine_id] = busy_time.get(machine_id, 0) + duration
+        span = horizon_end - self.available_at
+        return {
+            machine_id: {
+                "machine": self.dispatcher.machine_names[machine_id],
+                "work_center": self.dispatcher.machine_work_centers[machine_id],
+                "busy_time": busy,
+                "utilization": busy / span if span > 0 else 0.0,
+            }
+            for machine_id, busy in busy_time.items()
+        }
+
+    def working_window(self, start=None, end=None):
+        """
+        The (start, end) working-time range between two timestamps, open where they are None,
+        or None when both are. Timestamps past the end of the plan are clamped to it, so a far
+        off date does not grow the shared calendar.
+        """
+        if start is None and end is None:
+            return None
+        with self._lock:
+            plan_end = max((int(batches.ends.max()) for batches in self.batches if len(batches.ends)), default=self.available_at)
+        last = self.calendar.to_datetime(plan_end, end=True)
+        open_end = np.iinfo(np.int64).max
+        return (
+            0 if start is None else plan_end if start >= last else self.calendar.to_working_time(start),
+            open_end if end is None or end >= last else self.calendar.to_working_time(end),
+        )
+
+    def iter_rows(self, granularity="piece", window=None):
+        """
+        Yield the schedule rows of the kept plan, as iter_scheduled_operations does, limited to
+        the working-time window when one is given.
+        """
+        with self._lock:
+            plan = list(zip(self.sequence, self.batches))
+        for op, batches in plan:
+            yield from schedule_operation_rows(op, batches, self.dispatcher, self.calendar, granularity, window)
+
+    def iter_columns(self, granularity="piece", window=None):
+        """
+        Yield the schedule of the kept plan one operation at a time, as column arrays; see
+        schedule_operation_columns.
+        """
+        with self._lock:
+            plan = list(zip(self.sequence, self.batches))
+        for op, batches in plan:
+            columns = schedule_operation_columns(op, batches, self.dispatcher, self.calendar, granularity, window)
+            if columns is not None:
+                yield columns
@@ -0,0 +1,236 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+import numpy as np
+from pony.orm import select
+from app.database.models import Operation, db
+from app.algorithms.dispatch import MachineDispatcher, DISPATCHABLE_STATUSES
+from app.algorithms.shift_calendar import ShiftCalendar, MICROSECONDS_PER_MINUTE
+
+class PlanOperation(NamedTuple):
+    operation_id: int
+    order_id: int
+    part_number: str
+    work_center_id: int
+    work_center_code: str
+    operation_number: int
+    operation_description: str
+    per_piece_time: float
+    jump_quantity: int
+    total_quantity: int
+    actual_time: Optional[float]
+    confirmation_number: Optional[str]
+
+class DispatchedBatches(NamedTuple):
+    machine_ids: list
+    quantity_starts: np.ndarray
+    quantity_ends: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+
+def load_active_machines(database=db, key: str = "id"):
+    """
+    Map each work center to its dispatchable machines as (machine_id, machine_name), with a
+    single query. Work centers are keyed by their id, or by their code when key is "code".
+    """
+    if key not in ("id", "code"):
+        raise ValueError(f"Unknown work center key: {key}")
+    machines = {}
+    rows = select(
+        (
+            wcm.work_center.work_center_id, wcm.work_center.work_center_code,
+            wcm.machine_id, wcm.machine_name, wcm.status
+        )
+        for wcm in database.WorkCenterMachine
+    ).order_by(3)
+    for work_center_id, work_center_code, machine_id, machine_name, status in rows:
+        if status in DISPATCHABLE_STATUSES:
+            work_center = work_center_id if key == "id" else work_center_code
+            machines.setdefault(work_center, []).append((machine_id, machine_name))
+    return machines
+
+def load_plan_snapshot(database=db):
+    """
+    Load operations with their orders and work centers, and the active machines of every work
+    center, in a constant number of queries, from database (the primary by default). Must be
+    called inside a db_session; the result is plain data that can be used after the session ends.
+    """
+    operation = database.Operation
+    operations = select(op for op in operation).order_by(operation.operation_id).prefetch(
+        operation.order, operation.work_center
+    )
+    return [to_plan_operation(op) for op in operations], load_active_machines(database)
+
+def to_plan_operation(op: Operation) -> PlanOperation:
+    """
+    Plain copy of an Operation entity and the fields of its order and work center used in planning.
+    """
+    return PlanOperation(
+        operation_id=op.operation_id,
+        order_id=op.order.order_id,
+        part_number=op.order.part_number,
+        work_center_id=op.work_center.work_center_id,
+        work_center_code=op.work_center.work_center_code,
+        operation_number=op.operation_number,
+        operation_description=op.operation_description,
+        per_piece_time=op.per_piece_time,
+        jump_quantity=op.jump_quantity,
+        total_quantity=op.total_quantity,
+        actual_time=op.actual_time,
+        confirmation_number=op.confirmation_number,
+    )
+
+def planned_piece_time(op: PlanOperation) -> int:
+    """
+    Working microseconds per piece: the reported actual time spread over the quantity once a
+    confirmation has set it, otherwise the routing per-piece time. An actual time that is not
+    positive counts as unset, so a bad value cannot end batches before they start.
+    """
+    if op.actual_time is not None and op.actual_time > 0 and op.total_quantity > 0:
+        return round(op.actual_time / op.total_quantity * MICROSECONDS_PER_MINUTE)
+    return round(op.per_piece_time * MICROSECONDS_PER_MINUTE)
+
+def batch_size(op: PlanOperation) -> int:
+    """
+    Pieces per dispatched batch: the jump quantity, or the whole operation when none is set.
+    """
+    return op.jump_quantity if 0 < op.jump_quantity < op.total_quantity else max(op.total_quantity, 1)
+
+def dispatch_operation(op: PlanOperation, ready_at: int, dispatcher: MachineDispatcher) -> DispatchedBatches:
+    """
+    Dispatch the jump-quantity batches of op, all released at ready_at, onto the machines of
+    its work center.
+    """
+    piece_time = planned_piece_time(op)
+    step = batch_size(op)
+    quantity_starts = np.arange(1, op.total_quantity + 1, step, dtype=np.int64)
+    quantity_ends = np.minimum(quantity_starts + step - 1, op.total_quantity)
+    last_pieces = int(quantity_ends[-1] - quantity_starts[-1] + 1) if len(quantity_starts) else 0
+    machine_ids, starts, ends = dispatcher.dispatch_batches(
+        op.work_center_id, ready_at, step * piece_time, len(quantity_starts), last_pieces * piece_time
+    )
+    return DispatchedBatches(machine_ids, quantity_starts, quantity_ends, starts, ends)
+
+def dispatch_sequence(operations) -> list:
+    """
+    Operations in dispatch order: order by order, in operation-number sequence.
+    """
+    return sorted(operations, key=lambda op: (op.order_id, op.operation_number, op.operation_id))
+
+def plan_operations(operations, dispatcher: MachineDispatcher):
+    """
+    Dispatch operations in dispatch_sequence order. An operation is released when the previous
+    operation of its order has finished. Yields (op, batches).
+    """
+    order_ready = {}
+    for op in dispatch_sequence(operations):
+        batches = dispatch_operation(op, order_ready.get(op.order_id, dispatcher.available_at), dispatcher)
+        if len(batches.ends):
+            order_ready[op.order_id] = int(batches.ends.max())
+        yield op, batches
+
+def schedule_operation_columns(op, batches, dispatcher, calendar, granularity="piece", window=None):
+    """
+    The schedule rows of one dispatched operation as a dict of equal-length arrays, or None when
+    it has no rows.
+
+    "piece" gives one row per piece and "batch" one interval per jump-quantity batch with its
+    quantity range; rows crossing the end of a shift are split into one row per shift. "shift"
+    gives one row per machine and shift, covering the batches it ran there, with their count.
+    window is a (start, end) range of working time; only rows overlapping it are kept. Start
+    and end times are datetime64[us].
+    """
+    if not len(batches.starts):
+        return None
+    if window is not None and (batches.ends.max() <= window[0] or batches.starts.min() >= window[1]):
+        return None
+
+    # Offsets are computed from the batch start so long runs do not accumulate rounding drift
+    if granularity == "piece":
+        piece_time = planned_piece_time(op)
+        quantities = np.arange(1, op.total_quantity + 1)
+        rows = (quantities - 1) // batch_size(op)
+        starts = batches.starts[rows] + (quantities - batches.quantity_starts[rows]) * piece_time
+        ends = starts + piece_time
+        first_quantities = last_quantities = quantities
+    else:
+        rows = np.arange(len(batches.starts))
+        starts, ends = batches.starts, batches.ends
+        first_quantities, last_quantities = batches.quantity_starts, batches.quantity_ends
+
+    if window is not None:
+        visible = (ends > window[0]) & (starts < window[1])
+        rows, starts, ends = rows[visible], starts[visible], ends[visible]
+        first_quantities, last_quantities = first_quantities[visible], last_quantities[visible]
+
+    segment_starts, segment_ends, sources = calendar.split(starts, ends)
+    machine_names = np.array([dispatcher.machine_names[machine_id] for machine_id in batches.machine_ids], dtype=object)
+    batch_counts = None
+
+    if granularity == "shift":
+        # Group the shift segments of the batches by machine and shift
+        machine_numbers = {machine_id: number for number, machine_id in enumerate(dict.fromkeys(batches.machine_ids))}
+        machines = np.array([machine_numbers[machine_id] for machine_id in batches.machine_ids])[rows[sources]]
+        shifts = calendar.shift_index(segment_starts)
+        order = np.lexsort((segment_starts, shifts, machines))
+        machines, shifts = machines[order], shifts[order]
+        group_starts = np.flatnonzero(np.concatenate([[True], (machines[1:] != machines[:-1]) | (shifts[1:] != shifts[:-1])]))
+        sources = sources[order]
+        first_rows = sources[group_starts]
+        segment_starts = np.minimum.reduceat(segment_starts[order], group_starts)
+        segment_ends = np.maximum.reduceat(segment_ends[order], group_starts)
+        first_quantities = np.minimum.reduceat(first_quantities[sources], group_starts)
+        last_quantities = np.maximum.reduceat(last_quantities[sources], group_starts)
+        batch_counts = np.diff(np.append(group_starts, len(sources)))
+        sources = first_rows
+        group_rows = np.arange(len(group_starts))
+    else:
+        group_rows = sources
+
+    start_times, end_times = calendar.to_datetimes(segment_starts, segment_ends)
+    count = len(sources)
+
+    columns = {
+        "part_number": np.full(count, op.part_number, dtype=object),
+        "operation_id": np.full(count, op.operation_id, dtype=np.int64),
+        "operation_description": np.full(count, op.operation_description, dtype=object),
+        "machine": machine_names[rows[sources]],
+        "start_time": start_times,
+        "end_time": end_times,
+    }
+    if granularity == "piece":
+        columns["launched_quantity"] = last_quantities[sources]  # Each quantity gets a sequential number
+    else:
+        columns["quantity_start"] = first_quantities[group_rows]
+        columns["quantity_end"] = last_quantities[group_rows]
+    if batch_counts is not None:
+        columns["batches"] = batch_counts
+    return columns
+
+def schedule_operation_rows(op, batches, dispatcher, calendar, granularity="piece", window=None):
+    """
+    Yield the schedule rows of one dispatched operation as dicts; see schedule_operation_columns.
+    """
+    columns = schedule_operation_columns(op, batches, dispatcher, calendar, granularity, window)
+    if columns is None:
+        return
+    names = list(columns)
+    for values in zip(*[columns[name].tolist() for name in names]):
+        yield dict(zip(names, values))
+
+def create_plan(machines, calendar=None, start_time=None):
+    """
+    Calendar and dispatcher for a plan starting at start_time (default now) on the shift calendar.
+    """
+    start_time = start_time or datetime.now()
+    calendar = calendar or ShiftCalendar.from_env(start_time.date())
+    return calendar, MachineDispatcher(machines, calendar.to_working_time(start_time))
+
+def iter_scheduled_operations(operations, machines, granularity="piece", calendar=None, dispatcher=None):
+    """
+    Yield the schedule rows of the operations from now on the shift calendar, one operation at
+    a time, dispatching each batch to the earliest free active machine of its work center.
+    """
+    if dispatcher is None:
+        calendar, dispatcher = create_plan(machines, calendar)
+    for op, batches in plan_operations(operations, dispatcher):
+        yield from schedule_operation_rows(op, batches, dispatcher, calendar, granularity)
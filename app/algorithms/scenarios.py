@@ -0,0 +1,160 @@
+from datetime import datetime
+from typing import Optional
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import pandas as pd
+from app.algorithms.scheduling import ComponentSchedule, schedule_components
+
+# Snapshot files written by publish_snapshot, kept for the latest versions so scenarios of a
+# request still running on the previous version can load it
+SNAPSHOT_FILES_KEPT = 2
+
+_snapshot_directory = None
+_snapshot_files = {}  # Version to path, oldest first
+_snapshot_files_lock = threading.Lock()
+
+# Scheduling snapshot of a planning worker as (version, operations, machines), loaded from its
+# file once per version on the first scenario that needs it
+_snapshot = None
+
+def publish_snapshot(version: int, operations: pd.DataFrame, machines: dict) -> str:
+    """
+    Write the snapshot of a data version to a file the planning workers load it from, once per
+    version, and return its path. Workers then receive only the path with every scenario.
+    """
+    global _snapshot_directory
+    with _snapshot_files_lock:
+        if version in _snapshot_files:
+            return _snapshot_files[version]
+        if _snapshot_directory is None:
+            _snapshot_directory = tempfile.mkdtemp(prefix="scenario-snapshots-")
+            atexit.register(shutil.rmtree, _snapshot_directory, True)
+
+        path = os.path.join(_snapshot_directory, f"{version}.pickle")
+        with open(path + ".tmp", "wb") as file:
+            pickle.dump((operations, machines), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        _snapshot_files[version] = path
+        while len(_snapshot_files) > SNAPSHOT_FILES_KEPT:
+            os.remove(_snapshot_files.pop(next(iter(_snapshot_files))))
+        return path
+
+def _load_snapshot(version: int, path: str):
+    global _snapshot
+    if _snapshot is None or _snapshot[0] != version:
+        with open(path, "rb") as file:
+            _snapshot = (version, *pickle.load(file))
+    return _snapshot[1:]
+
+def summarize_schedule(schedule: ComponentSchedule, operations: pd.DataFrame) -> dict:
+    """
+    Makespan, mean machine utilization per work center and completion time per order of a schedule.
+    """
+    utilization = {}
+    for machine in schedule.machines:
+        utilization.setdefault(str(machine["work_center"]), []).append(machine["utilization"])
+
+    order_completion = {}
+    if len(schedule.intervals):
+        order_ids = schedule.intervals["operation_id"].map(operations.set_index("operation_id")["order_id"])
+        order_completion = {
+            int(order_id): end_time.to_pydatetime()
+            for order_id, end_time in schedule.intervals["end_time"].groupby(order_ids).max().items()
+        }
+
+    return {
+        "start_time": schedule.start_time,
+        "completion_time": schedule.completion_time,
+        "makespan_minutes": (schedule.completion_time - schedule.start_time).total_seconds() / 60,
+        "truncated": schedule.truncated,
+        "remaining_quantities": schedule.remaining_quantities,
+        "work_center_utilization": {
+            work_center: sum(values) / len(values) for work_center, values in sorted(utilization.items())
+        },
+        "order_completion": order_completion,
+    }
+
+def run_scenario(version: int, path: str, scenario) -> dict:
+    """
+    Schedule and summarize one scenario in a planning worker, on the snapshot of version
+    published at path. scenario is (component_quantities, start_date, horizon_end, time_limit).
+    """
+    operations, machines = _load_snapshot(version, path)
+    component_quantities, start_date, horizon_end, time_limit = scenario
+    started = time.perf_counter()
+    schedule = schedule_components(operations, machines, component_quantities, start_date, horizon_end, time_limit)
+    summary = summarize_schedule(schedule, operations)
+    summary["run_seconds"] = time.perf_counter() - started
+    return summary
+
+async def run_scenarios(
+    version: int,
+    operations: pd.DataFrame,
+    machines: dict,
+    scenarios: list,
+    start_date: Optional[datetime] = None,
+    horizon_end: Optional[datetime] = None,
+    time_limit: Optional[float] = None
+) -> list:
+    """
+    Schedule every (name, component_quantities) scenario against the snapshot of a data version
+    from load_scheduling_snapshot, in parallel on the planning workers, and return one summary
+    per scenario in the given order. All scenarios share the same start, so their results compare.
+    """
+    if not scenarios:
+        return []
+    from starlette.concurrency import run_in_threadpool
+    from app.executors import run_cpu
+
+    path = await run_in_threadpool(publish_snapshot, version, operations, machines)
+    start_date = start_date or datetime.now()
+    summaries = await asyncio.gather(*[
+        run_cpu(run_scenario, version, path, (quantities, start_date, horizon_end, time_limit))
+        for _, quantities in scenarios
+    ])
+    return [{"scenario": name, **summary} for (name, _), summary in zip(scenarios, summaries)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare what-if scenarios of component quantities.")
+    parser.add_argument("path", help='JSON file of {"scenario name": {"component": quantity, ...}, ...}')
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: PLAN_WORKERS)")
+    parser.add_argument("--time-limit", type=float, default=None, help="Seconds per scenario")
+    args = parser.parse_args(argv)
+
+    if args.workers:
+        os.environ["PLAN_WORKERS"] = str(args.workers)
+    from pony.orm import db_session
+    from app.database.models import init_database, get_data_version
+    from app.algorithms.scheduling import load_scheduling_snapshot
+    from app.executors import shutdown_executors
+
+    with open(args.path) as file:
+        scenarios = list(json.load(file).items())
+    init_database()
+    with db_session:
+        version = get_data_version()
+        operations, machines = load_scheduling_snapshot()
+
+    started = time.perf_counter()
+    try:
+        results = asyncio.run(run_scenarios(version, operations, machines, scenarios, time_limit=args.time_limit))
+    finally:
+        shutdown_executors()
+    for result in results:
+        print(
+            f"{result['scenario']:<24} {result['makespan_minutes']:>12.1f} min  "
+            f"{result['completion_time']:%Y-%m-%d %H:%M}  {result['run_seconds']:6.2f}s"
+            f"{'  truncated' if result['truncated'] else ''}"
+        )
+    print(f"{len(results)} scenarios, {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,113 +1,203 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import NamedTuple, Optional
+import time
+import numpy as np
 import pandas as pd
 from pony.orm import db_session, select  # Import necessary for database access
-from app.database.models import Operation, MasterOrder  # Import your models
+from app.database.models import db
+from app.algorithms.dispatch import MachineDispatcher
+from app.algorithms.plan import load_active_machines
+from app.algorithms.shift_calendar import ShiftCalendar, MICROSECONDS_PER_MINUTE
+
+SNAPSHOT_COLUMNS = [
+    "operation_id", "order_id", "work_center", "operation_number", "operation_description", "setup_time",
+    "per_piece_time", "jump_quantity", "launched_quantity", "allowed_time", "actual_time", "confirmation_number",
+]
+
+class ComponentSchedule(NamedTuple):
+    intervals: pd.DataFrame  # component, operation_id, machine, start_time, end_time per piece and shift
+    start_time: datetime  # Start of the first shift at or after the requested start
+    completion_time: datetime
+    remaining_quantities: dict  # Units not scheduled because the horizon or time limit was reached
+    machines: list  # Per machine: name, work center, end time, busy minutes and utilization
+    truncated: bool  # Stopped at the horizon or time limit
+
+def piece_intervals(start: int, piece_duration: int, quantity: int) -> (np.ndarray, np.ndarray):
+    """
+    Working-time intervals of quantity back-to-back pieces starting at start, from the
+    cumulative sum of their durations.
+    """
+    ends = start + np.cumsum(np.full(quantity, piece_duration, dtype=np.int64))
+    return ends - piece_duration, ends
+
+def build_work_center_index(df_sorted: pd.DataFrame) -> dict:
+    """
+    Map each work center to the slice of its rows in a frame sorted by work center.
+    """
+    work_centers, first_rows, row_counts = np.unique(
+        df_sorted["work_center"].to_numpy(), return_index=True, return_counts=True
+    )
+    return {
+        work_center: slice(first_row, first_row + row_count)
+        for work_center, first_row, row_count in zip(work_centers, first_rows, row_counts)
+    }
+
+def load_scheduling_snapshot(database=db) -> (pd.DataFrame, dict):
+    """
+    Frame of every operation with its work center code and the launched quantity of its order,
+    and the dispatchable machines of every work center keyed by code, in two queries. The frame
+    and the machine lists hold no entities, so they outlive the db_session they were read in.
+    """
+    rows = select(
+        (
+            op.operation_id, op.order.order_id, op.work_center.work_center_code, op.operation_number,
+            op.operation_description, op.setup_time, op.per_piece_time, op.jump_quantity,
+            op.order.launched_quantity, op.allowed_time, op.actual_time, op.confirmation_number
+        )
+        for op in database.Operation
+    ).without_distinct()[:]
+    df = pd.DataFrame(list(rows), columns=SNAPSHOT_COLUMNS)
+    return df, load_active_machines(database, key="code")
 
 def schedule_operations(component_quantities: dict) -> (pd.DataFrame, datetime, float, dict):
     with db_session:
-        # Fetch operations and their associated master orders from the database
-        operations = select(op for op in Operation)  # Fetch all operations
-        master_orders = {order.order_id: order for order in select(mo for mo in MasterOrder)}  # Fetch all master orders
-
-        # Convert operations to a DataFrame
-        df = pd.DataFrame([{
-            "operation_id": op.operation_id,
-            "order_id": op.order.order_id,
-            "work_center": op.work_center.work_center_code,
-            "operation_number": op.operation_number,
-            "operation_description": op.operation_description,
-            "setup_time": op.setup_time,
-            "per_piece_time": op.per_piece_time,
-            "jump_quantity": op.jump_quantity,
-            "launched_quantity": op.order.launched_quantity if op.order else 0,  # Use launched quantity from MasterOrder
-            "allowed_time": op.allowed_time,
-            "actual_time": op.actual_time,
-            "confirmation_number": op.confirmation_number
-        } for op in operations])
+        df, machines = load_scheduling_snapshot()
 
     if df.empty:
         return pd.DataFrame(), datetime.now(), 0.0, {}
 
+    schedule = schedule_components(df, machines, component_quantities)
+    result = schedule.intervals
+    # Per-machine busy time and utilization of the plan, keyed by machine id
+    result.attrs["machine_utilization"] = {
+        machine["machine_id"]: {key: machine[key] for key in ("machine", "work_center", "busy_minutes", "utilization")}
+        for machine in schedule.machines
+    }
+    return result, schedule.completion_time, 0.0, schedule.remaining_quantities
+
+def schedule_components(
+    df: pd.DataFrame,
+    machines: dict,
+    component_quantities: dict,
+    start_date: Optional[datetime] = None,
+    horizon_end: Optional[datetime] = None,
+    time_limit: Optional[float] = None
+) -> ComponentSchedule:
+    """
+    Schedule component_quantities units of each component (work center code) on a snapshot from
+    load_scheduling_snapshot, from start_date (default now). Units are laid out one round at a
+    time; no round starts at or after horizon_end, and none after time_limit seconds, so the
+    run time stays bounded. What was left out is in remaining_quantities.
+    """
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    truncated = False
+
     # Sort and prepare for scheduling
     df_sorted = df.sort_values(by=['work_center', 'operation_number'])
-    start_date = datetime.now()  # Initialize start date
-    if pd.isnull(start_date):
-        start_date = datetime.now()
-
-    # Adjust start_date to the next 9 AM if it's not within shift hours
-    if start_date.hour < 9 or start_date.hour >= 17:
-        start_date = (start_date + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
-
-    schedule = []
-    machine_end_times = {wc.work_center_code: start_date for wc in select(wc for wc in WorkCenter)}
-    current_time = start_date
-    daily_production = {}
+    start_date = start_date or datetime.now()  # Initialize start date
+
+    # All times below are working microseconds on the shift calendar; a start outside
+    # shift hours moves to the start of the next shift
+    calendar = ShiftCalendar.from_env(start_date.date())
+    current_time = calendar.to_working_time(start_date)
+    start_date = calendar.to_datetime(current_time)  # Work starts with the next shift
+    horizon = calendar.to_working_time(horizon_end) if horizon_end is not None else None
+    # Each batch goes to the earliest free machine of its work center; work centers without
+    # active machines run on a single lane named after the work center
+    dispatcher = MachineDispatcher(machines, current_time, virtual_machine_name=None)
+    schedule = []  # (component, operation_id, machines, starts, ends) per scheduled operation
     remaining_quantities = component_quantities.copy()
 
+    # Index the operations by work center once, as plain arrays, so each unit only touches the
+    # rows of its own component
+    work_center_index = build_work_center_index(df_sorted)
+    operation_ids = df_sorted["operation_id"].to_numpy()
+    launched_quantities = df_sorted["launched_quantity"].to_numpy()
+    jump_quantities = df_sorted["jump_quantity"].to_numpy()
+    # Time per fraction of quantity, using the launched_quantity from MasterOrder
+    fraction_times = np.round(
+        df_sorted["per_piece_time"].to_numpy() / np.maximum(launched_quantities, 1) * MICROSECONDS_PER_MINUTE
+    ).astype(np.int64)
+
     def schedule_component(component, start_time):
-        component_ops = df_sorted[df_sorted["work_center"] == component]
-        unit_operations = []
         end_time = start_time  # Initialize end_time
-
-        for _, row in component_ops.iterrows():
-            # Extract operation details
-            operation_id = row["operation_id"]
-            per_piece_time = row["per_piece_time"]
-            launched_quantity = row["launched_quantity"]  # Now using the launched_quantity from MasterOrder
-
-            # Calculate the time per fraction of quantity
-            fraction_time = per_piece_time / launched_quantity
-            machine = row["work_center"]
-
-            start_time = max(start_time, machine_end_times[machine])
-
-            # Adjust start_time to next shift if it's outside shift hours
-            if start_time.hour < 9 or start_time.hour >= 17:
-                start_time = (start_time + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
-
-            # Process each fraction of the quantity
-            for i in range(1, launched_quantity + 1):
-                end_time = start_time + timedelta(minutes=fraction_time)
-
-                # If operation ends after shift, split it
-                if end_time.hour >= 17:
-                    remaining_time = (end_time - start_time).total_seconds() / 60
-                    today_end = start_time.replace(hour=17, minute=0, second=0, microsecond=0)
-                    today_duration = (today_end - start_time).total_seconds() / 60
-
-                    # Add operation for today
-                    unit_operations.append([component, operation_id, machine, start_time, today_end])
-                    machine_end_times[machine] = today_end
-
-                    # Schedule remaining time for next day
-                    next_day_start = (today_end + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
-                    next_day_end = next_day_start + timedelta(minutes=remaining_time - today_duration)
-                    unit_operations.append([component, operation_id, machine, next_day_start, next_day_end])
-                    machine_end_times[machine] = next_day_end
-                    end_time = next_day_end
-                else:
-                    unit_operations.append([component, operation_id, machine, start_time, end_time])
-                    machine_end_times[machine] = end_time
-
-                # Update start_time for the next fraction
-                start_time = end_time
-
-        return unit_operations, end_time
-
-    while any(remaining_quantities.values()):
-        day_start = current_time.replace(hour=9, minute=0, second=0, microsecond=0)
-        day_end = current_time.replace(hour=17, minute=0, second=0, microsecond=0)
-
+        rows = work_center_index.get(component)
+        if rows is None:
+            return end_time
+
+        for row in range(rows.start, rows.stop):
+            launched_quantity = int(launched_quantities[row])
+            if launched_quantity <= 0:
+                continue
+            jump_quantity = int(jump_quantities[row])
+            batch_quantity = jump_quantity if 0 < jump_quantity < launched_quantity else launched_quantity
+
+            # Dispatch the fractions in jump-quantity batches and lay out all pieces in one pass
+            fraction_time = int(fraction_times[row])
+            batch_count = -(-launched_quantity // batch_quantity)
+            last_batch = launched_quantity - (batch_count - 1) * batch_quantity
+            machine_ids, batch_starts, batch_ends = dispatcher.dispatch_batches(
+                component, start_time, batch_quantity * fraction_time, batch_count, last_batch * fraction_time
+            )
+            batches = np.arange(launched_quantity) // batch_quantity
+            starts, ends = piece_intervals(0, fraction_time, launched_quantity)
+            starts += batch_starts[batches] - batches * batch_quantity * fraction_time
+            ends += batch_starts[batches] - batches * batch_quantity * fraction_time
+            machine_names = np.array([dispatcher.machine_names[machine_id] for machine_id in machine_ids], dtype=object)
+            schedule.append((component, operation_ids[row], machine_names[batches], starts, ends))
+            end_time = max(end_time, int(batch_ends.max()))
+
+            # Start the next operation where this one ended
+            start_time = end_time
+
+        return end_time
+
+    while any(quantity > 0 for quantity in remaining_quantities.values()):
+        if (horizon is not None and current_time >= horizon) or (deadline is not None and time.monotonic() > deadline):
+            truncated = True
+            break
         # Loop through components and schedule operations for each
         for component, quantity in remaining_quantities.items():
             if quantity > 0:
                 # Schedule component operations
-                component_operations, final_end_time = schedule_component(component, current_time)
-                schedule.extend(component_operations)
+                final_end_time = schedule_component(component, current_time)
 
                 # Update remaining quantity
                 remaining_quantities[component] -= 1  # Reduce by 1 as each quantity is processed one at a time
 
         current_time = final_end_time
 
-    return pd.DataFrame(schedule, columns=["component", "operation_id", "machine", "start_time", "end_time"]), current_time, 0.0, remaining_quantities
+    completion_time = calendar.to_datetime(current_time, end=True)
+
+    columns = ["component", "operation_id", "machine", "start_time", "end_time"]
+    machine_usage = [
+        {
+            "machine_id": machine_id,
+            "machine": usage["machine"],
+            "work_center": usage["work_center"],
+            "end_time": calendar.to_datetime(dispatcher.end_times[machine_id], end=True) if machine_id in dispatcher.end_times else None,
+            "busy_minutes": usage["busy_time"] / MICROSECONDS_PER_MINUTE,
+            "utilization": usage["utilization"],
+        } for machine_id, usage in dispatcher.utilization().items()
+    ]
+    if not schedule:
+        return ComponentSchedule(
+            pd.DataFrame(columns=columns), start_date, completion_time, remaining_quantities, machine_usage, truncated
+        )
+
+    # Split every piece at the shift boundaries it crosses and map it to timestamps in one pass
+    entries = np.repeat(np.arange(len(schedule)), [len(starts) for _, _, _, starts, _ in schedule])
+    segment_starts, segment_ends, pieces = calendar.split(
+        np.concatenate([starts for _, _, _, starts, _ in schedule]),
+        np.concatenate([ends for _, _, _, _, ends in schedule]),
+    )
+    start_times, end_times = calendar.to_datetimes(segment_starts, segment_ends)
+    entries = entries[pieces]
+    result = pd.DataFrame({
+        "component": np.array([entry[0] for entry in schedule], dtype=object)[entries],
+        "operation_id": np.array([entry[1] for entry in schedule])[entries],
+        "machine": np.concatenate([machines for _, _, machines, _, _ in schedule])[pieces],
+        "start_time": start_times,
+        "end_time": end_times,
+    }, columns=columns)
+    return ComponentSchedule(result, start_date, completion_time, remaining_quantities, machine_usage, truncated)
@@ -0,0 +1,188 @@
+from datetime import date, datetime, time
+import os
+import numpy as np
+
+MICROSECONDS_PER_MINUTE = 60_000_000
+MICROSECONDS_PER_DAY = 24 * 60 * MICROSECONDS_PER_MINUTE
+
+def _time_offset(value: time) -> int:
+    """
+    Microseconds from midnight to value.
+    """
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+
+def _parse_shifts(value: str) -> list:
+    """
+    Parse "09:00-17:00,18:00-22:00" into a list of (start, end) times.
+    """
+    shifts = []
+    for item in value.split(","):
+        if item.strip():
+            start, end = item.split("-")
+            shifts.append((time.fromisoformat(start.strip()), time.fromisoformat(end.strip())))
+    return shifts
+
+class ShiftCalendar:
+    """
+    Working-time calendar of daily shifts, with optional weekend days and holidays.
+
+    Working time is counted in integer microseconds from the first shift of the origin day.
+    The working intervals and their cumulative working time are precomputed, so converting
+    between timestamps and working time is a binary search however long the span is. They are
+    replaced together when the horizon grows, and each method reads them once, so a calendar
+    shared between threads never mixes the arrays of two horizons.
+    """
+
+    def __init__(self, origin: date, shifts=((time(9), time(17)),), weekend_days=(), holidays=(), horizon_days=366):
+        if not shifts:
+            raise ValueError("A shift calendar needs at least one shift")
+        if len(set(weekend_days)) >= 7:
+            raise ValueError("A shift calendar needs at least one working weekday")
+
+        self.origin = origin
+        self.weekend_days = frozenset(weekend_days)  # Weekday numbers, Monday is 0
+        self.holidays = frozenset(holidays)
+        # A shift ending at or before its start time runs past midnight
+        self.shifts = np.array([
+            (_time_offset(start), _time_offset(end) + (MICROSECONDS_PER_DAY if end <= start else 0))
+            for start, end in shifts
+        ], dtype=np.int64)
+        self._origin = np.datetime64(datetime.combine(origin, time()), "us")
+        self._build(horizon_days)
+
+    @classmethod
+    def from_env(cls, origin: date) -> "ShiftCalendar":
+        """
+        Build the calendar from SHIFTS ("09:00-17:00,..."), WEEKEND_DAYS (weekday numbers,
+        Monday is 0) and HOLIDAYS (ISO dates). The defaults are one 09:00-17:00 shift every day.
+        """
+        shifts = _parse_shifts(os.getenv("SHIFTS", "09:00-17:00"))
+        weekend_days = [int(day) for day in os.getenv("WEEKEND_DAYS", "").split(",") if day.strip()]
+        holidays = [date.fromisoformat(day.strip()) for day in os.getenv("HOLIDAYS", "").split(",") if day.strip()]
+        return cls(origin, shifts, weekend_days, holidays)
+
+    def _build(self, horizon_days: int):
+        """
+        Precompute the merged working intervals of the horizon and their cumulative working time.
+        """
+        days = np.arange(horizon_days)
+        working = ~np.isin((self.origin.weekday() + days) % 7, list(self.weekend_days))
+        holiday_days = [(holiday - self.origin).days for holiday in self.holidays]
+        working[[day for day in holiday_days if 0 <= day < horizon_days]] = False
+
+        day_starts = days[working].astype(np.int64) * MICROSECONDS_PER_DAY
+        starts = (day_starts[:, None] + self.shifts[:, 0]).ravel()
+        ends = (day_starts[:, None] + self.shifts[:, 1]).ravel()
+        order = np.argsort(starts, kind="stable")
+        starts, ends = starts[order], ends[order]
+
+        # Merge shifts that touch or overlap so they do not split intervals at their seam
+        running_ends = np.maximum.accumulate(ends)
+        new_interval = np.concatenate([[True], starts[1:] > running_ends[:-1]])
+        first_rows = np.flatnonzero(new_interval)
+
+        starts, ends = starts[first_rows], np.maximum.reduceat(ends, first_rows)
+        cumulative = np.concatenate([[0], np.cumsum(ends - starts)])
+        self.horizon_days = horizon_days
+        self._intervals = (starts, ends, cumulative)
+
+    def _ensure_working_time(self, working_time: int):
+        """
+        The (starts, ends, cumulative) interval arrays, grown to cover working_time.
+        """
+        while working_time >= self._intervals[2][-1]:
+            self._build(self.horizon_days * 2)
+        return self._intervals
+
+    def _ensure_offset(self, offset: int):
+        """
+        The (starts, ends, cumulative) interval arrays, grown to cover offset from the origin.
+        """
+        while offset >= self._intervals[1][-1]:
+            self._build(self.horizon_days * 2)
+        return self._intervals
+
+    def to_working_time(self, moment: datetime) -> int:
+        """
+        Working time at moment. Moments outside a shift map to the start of the next shift.
+        """
+        offset = (np.datetime64(moment, "us") - self._origin).astype(np.int64)
+        if offset <= 0:
+            return 0
+        interval_starts, interval_ends, cumulative = self._ensure_offset(offset)
+        interval = np.searchsorted(interval_starts, offset, side="right") - 1
+        if interval < 0:
+            return 0
+        length = interval_ends[interval] - interval_starts[interval]
+        return int(cumulative[interval] + min(offset - interval_starts[interval], length))
+
+    def _intervals_of(self, starts: np.ndarray, ends: np.ndarray):
+        """
+        The interval arrays covering starts and ends, and the indices of the working intervals
+        holding each start and end. An end falling exactly on a shift boundary belongs to the
+        shift it closes.
+        """
+        intervals = self._ensure_working_time(int(max(ends.max(), starts.max())) if len(ends) else 0)
+        cumulative = intervals[2]
+        start_intervals = np.searchsorted(cumulative, starts, side="right") - 1
+        end_intervals = np.maximum(np.searchsorted(cumulative, ends, side="left") - 1, start_intervals)
+        return intervals, start_intervals, end_intervals
+
+    def shift_index(self, working_times: np.ndarray) -> np.ndarray:
+        """
+        Index of the working interval (a shift, or shifts merged where they touch) holding each
+        working time.
+        """
+        working_times = np.asarray(working_times, dtype=np.int64)
+        _, _, cumulative = self._ensure_working_time(int(working_times.max()) if len(working_times) else 0)
+        return np.searchsorted(cumulative, working_times, side="right") - 1
+
+    def to_datetimes(self, starts: np.ndarray, ends: np.ndarray) -> (np.ndarray, np.ndarray):
+        """
+        Map working-time intervals to datetime64[us] start and end timestamps.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        (interval_starts, _, cumulative), start_intervals, end_intervals = self._intervals_of(starts, ends)
+        start_offsets = interval_starts[start_intervals] + (starts - cumulative[start_intervals])
+        end_offsets = interval_starts[end_intervals] + (ends - cumulative[end_intervals])
+        return (
+            self._origin + start_offsets.astype("timedelta64[us]"),
+            self._origin + end_offsets.astype("timedelta64[us]"),
+        )
+
+    def to_datetime(self, working_time: int, end: bool = False) -> datetime:
+        """
+        Timestamp of a single working time, as the end of an interval when end is set.
+        """
+        interval_starts, _, cumulative = self._ensure_working_time(working_time)
+        interval = np.searchsorted(cumulative, working_time, side="left" if end else "right") - 1
+        interval = max(interval, 0)
+        offset = interval_starts[interval] + (working_time - cumulative[interval])
+        return (self._origin + np.timedelta64(int(offset), "us")).astype(datetime)
+
+    def add_working_time(self, moment: datetime, minutes: float) -> datetime:
+        """
+        Timestamp reached after working the given minutes from moment.
+        """
+        working_time = self.to_working_time(moment) + round(minutes * MICROSECONDS_PER_MINUTE)
+        return self.to_datetime(working_time, end=True)
+
+    def split(self, starts: np.ndarray, ends: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        Split working-time intervals at shift boundaries, so every segment lies within one shift.
+        Returns the segment starts and ends and, per segment, the index of its source interval.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        (_, _, cumulative), start_intervals, end_intervals = self._intervals_of(starts, ends)
+
+        segment_counts = end_intervals - start_intervals + 1
+        sources = np.repeat(np.arange(len(starts)), segment_counts)
+        first_segments = np.cumsum(segment_counts) - segment_counts
+        intervals = start_intervals[sources] + np.arange(len(sources)) - np.repeat(first_segments, segment_counts)
+        return (
+            np.maximum(starts[sources], cumulative[intervals]),
+            np.minimum(ends[sources], cumulative[intervals + 1]),
+            sources,
+        )
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+import threading
+
+class LRUCache:
+    """
+    Thread-safe mapping that keeps the max_entries most recently used items and, when max_bytes
+    is set, at most that many bytes of values (measured with len, e.g. of bytes bodies). A value
+    larger than max_bytes on its own is not stored.
+    """
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        size = len(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._items:
+                self._pop(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._items[key] = value
+            self.nbytes += size
+            while len(self._items) > self.max_entries or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self._pop(next(iter(self._items)))
+
+    def _pop(self, key):
+        value = self._items.pop(key)
+        if self.max_bytes is not None:
+            self.nbytes -= len(value)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,47 @@
+def bulk_insert(entity, rows: list):
+    """
+    Insert rows, dicts of attribute name to value with references given as primary keys, using
+    multi-row INSERT statements on the connection of the current db_session. Statements are
+    sized to the provider's parameter limit. Values are validated and converted as the entity
+    would, so a missing or empty required attribute raises ValueError before anything is
+    inserted. Call flush() first when the rows reference entities created in the same session;
+    the inserted rows are not loaded into the session.
+    """
+    if not rows:
+        return
+
+    database = entity._database_
+    provider = database.provider
+    attributes = [entity._adict_[name] for name in rows[0]]
+    columns = [column for attribute in attributes for column in attribute.columns]
+    placeholder = "?" if provider.paramstyle == "qmark" else "%s"
+    row_placeholders = "(" + ", ".join([placeholder] * len(columns)) + ")"
+    statement = "INSERT INTO {} ({}) VALUES ".format(
+        provider.quote_name(entity._table_), ", ".join(provider.quote_name(column) for column in columns)
+    )
+
+    values = [validate_row(entity, attributes, row) for row in rows]
+    cursor = database.get_connection().cursor()
+    batch_size = max(provider.max_params_count // len(columns), 1)
+    for first in range(0, len(values), batch_size):
+        batch = values[first:first + batch_size]
+        cursor.execute(
+            statement + ", ".join([row_placeholders] * len(batch)),
+            [value for row in batch for value in row]
+        )
+
+def validate_row(entity, attributes, row: dict) -> list:
+    """
+    The values of row for attributes, checked and converted by each attribute. References stay
+    primary keys and are only checked to be present when required.
+    """
+    values = []
+    for attribute in attributes:
+        value = row[attribute.name]
+        if attribute.is_relation:
+            if value is None and attribute.is_required:
+                raise ValueError(f"Attribute {attribute} is required")
+        else:
+            value = attribute.validate(value, None, entity, from_db=False)
+        values.append(value)
+    return values
@@ -1,31 +1,54 @@
-from pony.orm import Database
-from dotenv import load_dotenv
+from typing import NamedTuple, Optional
 import os
 
-# Initialize dotenv for environment variables
-load_dotenv()
+class DatabaseSettings(NamedTuple):
+    user: Optional[str]
+    password: Optional[str]
+    host: Optional[str]
+    name: Optional[str]
+    port: Optional[str]
+    pool_size: int  # Threads running database work in the API, each holding its own connection
+    statement_timeout_ms: int  # Statements running longer are cancelled by the server; 0 disables
+    connect_timeout: int  # Seconds
+    replica_hosts: tuple  # "host" or "host:port" of read replicas of the primary
+    migrate: bool  # Create missing tables and indexes on startup
 
-# Create the database connection
-db = Database()
+    def bind_arguments(self, host: Optional[str] = None) -> dict:
+        """
+        Keyword arguments of Database.bind for the primary, or for a replica host.
+        """
+        port = self.port
+        if host is not None:
+            host, _, replica_port = host.partition(":")
+            port = replica_port or port
+        arguments = {
+            "user": self.user,
+            "password": self.password,
+            "host": host or self.host,
+            "database": self.name,
+            "port": port,
+            "connect_timeout": self.connect_timeout,
+        }
+        if self.statement_timeout_ms:
+            arguments["options"] = f"-c statement_timeout={self.statement_timeout_ms}"
+        return arguments
 
-# Bind the database with the connection details from the environment variables
-db.bind(
-    provider='postgres',  # You can use another provider like 'sqlite', 'mysql', etc.
-    user=os.getenv('DB_USER'),
-    password=os.getenv('DB_PASSWORD'),
-    host=os.getenv('DB_HOST'),
-    database=os.getenv('DB_NAME')
-)
-
-def initialize_database():
+def load_settings() -> DatabaseSettings:
     """
-    Initialize the database schema and create necessary tables if they do not exist.
+    Database settings from the environment, after loading a .env file if there is one.
     """
-    if not hasattr(db, 'mapping_generated') or not db.mapping_generated:
-        # Generate mapping and create tables if they don't exist
-        db.generate_mapping(create_tables=True)  # Will create the tables if they don't exist
-        db.mapping_generated = True
-    else:
-        # Optionally, you can reset the mapping if you are making changes
-        db.mapping_generated = False  # Reset the flag to allow re-generation
-        db.generate_mapping(create_tables=True)  # Re-generate mapping
\ No newline at end of file
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return DatabaseSettings(
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        name=os.getenv("DB_NAME"),
+        port=os.getenv("DB_PORT"),
+        pool_size=int(os.getenv("DB_POOL_SIZE", "8")),
+        statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000")),
+        connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", "10")),
+        replica_hosts=tuple(host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()),
+        migrate=os.getenv("DB_MIGRATE", "").lower() in ("1", "true", "yes"),
+    )
@@ -0,0 +1,137 @@
+import argparse
+import logging
+from pony.orm import db_session, select, count
+from app.database.models import db
+
+logger = logging.getLogger(__name__)
+
+def sqlite_unique_index(connection, table_name: str, column_names) -> str:
+    """
+    Name of a unique index of a SQLite table on exactly column_names, or None. SQLite drops the
+    name of a unique constraint declared in CREATE TABLE and indexes it as sqlite_autoindex_*.
+    """
+    cursor = connection.cursor()
+    cursor.execute(f'PRAGMA index_list("{table_name}")')
+    for _, index_name, unique, *_ in cursor.fetchall():
+        if unique:
+            cursor.execute(f'PRAGMA index_info("{index_name}")')
+            if [row[2] for row in cursor.fetchall()] == list(column_names):
+                return index_name
+    return None
+
+def missing_indexes(database=db) -> list:
+    """
+    Indexes and unique constraints declared on the entities but absent from the database, which
+    happens when the tables were created before they were declared: create_tables only creates
+    missing tables. Must be called inside a db_session.
+    """
+    provider = database.provider
+    connection = database.get_connection()
+    missing = []
+    for table in database.schema.tables.values():
+        for index in table.indexes.values():
+            if index.is_pk or index.exists(provider, connection):
+                continue
+            if index.is_unique and provider.dialect == "SQLite" and sqlite_unique_index(
+                connection, table.name, [column.name for column in index.columns]
+            ):
+                continue
+            missing.append(index)
+    return missing
+
+def duplicate_production_orders(database=db) -> dict:
+    """
+    Production order numbers held by more than one master order, with their order ids. They
+    must be merged or renumbered before the unique constraint can be created.
+    """
+    duplicates = select(
+        (mo.production_order_no, count(mo)) for mo in database.MasterOrder if count(mo) > 1
+    )[:]
+    numbers = [number for number, _ in duplicates]
+    orders = {}
+    for number, order_id in select(
+        (mo.production_order_no, mo.order_id) for mo in database.MasterOrder if mo.production_order_no in numbers
+    ).order_by(2):
+        orders.setdefault(number, []).append(order_id)
+    return orders
+
+def apply_indexes(database=db) -> list:
+    """
+    Create the missing indexes in one transaction and return their names. Raises ValueError,
+    creating nothing, if the data would violate a unique constraint to be added.
+    """
+    with db_session:
+        indexes = missing_indexes(database)
+        if any(index.is_unique for index in indexes):
+            duplicates = duplicate_production_orders(database)
+            if duplicates:
+                raise ValueError(f"Duplicate production order numbers (order ids): {duplicates}")
+
+        cursor = database.get_connection().cursor()
+        if indexes and database.provider.dialect == "PostgreSQL":
+            # Building an index on a large table can outlast the statement timeout of the API
+            cursor.execute("SET LOCAL statement_timeout = 0")
+        for index in indexes:
+            logger.info(f"Creating index {index.name} on {index.table.name}")
+            cursor.execute(index.get_create_command())
+        return [index.name for index in indexes]
+
+# The hot access paths of scheduling, as (description, query of a database) pairs for explain_access_paths
+ACCESS_PATHS = [
+    ("operations of an order", lambda database: select(
+        op for op in database.Operation if op.order.order_id == 1
+    ).order_by(database.Operation.operation_number)),
+    ("operations of a work center", lambda database: select(
+        op for op in database.Operation if op.work_center.work_center_id == 1
+    ).order_by(database.Operation.operation_number)),
+    ("machines of a work center", lambda database: select(
+        wcm for wcm in database.WorkCenterMachine if wcm.work_center.work_center_id == 1 and wcm.status == "Active"
+    )),
+    ("order by production order number", lambda database: select(
+        mo for mo in database.MasterOrder if mo.production_order_no == ""
+    )),
+]
+
+def explain_access_paths(database=db) -> dict:
+    """
+    The query plan the database picks for each access path in ACCESS_PATHS, to check that the
+    indexes are used.
+    """
+    explain = "EXPLAIN QUERY PLAN " if database.provider.dialect == "SQLite" else "EXPLAIN "
+    plans = {}
+    with db_session:
+        cursor = database.get_connection().cursor()
+        for description, query in ACCESS_PATHS:
+            sql, arguments = query(database)._construct_sql_and_arguments()[:2]
+            cursor.execute(explain + sql, arguments)
+            plans[description] = "\n".join(str(row[-1]) for row in cursor.fetchall())
+    return plans
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create the tables and indexes declared on the entities that the database is missing.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the missing indexes of existing tables")
+    parser.add_argument("--explain", action="store_true", help="Print the query plans of the scheduling access paths")
+    args = parser.parse_args(argv)
+
+    from app.database.models import init_database
+    init_database(create_tables=not args.dry_run)
+
+    if args.dry_run:
+        with db_session:
+            for index in missing_indexes():
+                print(index.get_create_command())
+    else:
+        try:
+            created = apply_indexes()
+        except ValueError as e:
+            print(e)
+            return 1
+        print(f"Created {len(created)} indexes: {', '.join(created) or '-'}")
+
+    if args.explain:
+        for description, plan in explain_access_paths().items():
+            print(f"{description}:\n{plan}\n")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
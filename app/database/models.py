@@ -1,93 +1,164 @@
-from pony.orm import Database, Required, Optional, PrimaryKey, Set
-from datetime import date
-
-db = Database()
-
-class MasterOrder(db.Entity):
-    order_id = PrimaryKey(int, auto=True)
-    project_name = Required(str)
-    part_number = Required(str)
-    wbs = Required(str)
-    sale_order = Required(str)
-    part_description = Required(str)
-    total_operations = Required(int)
-    plant = Required(str)
-    routing_sequence_no = Required(int)
-    required_quantity = Required(int)
-    launched_quantity = Required(int)
-    production_order_no = Required(str)
-    # Relationships
-    document_references = Set('DocumentReference')
-    raw_materials = Set('RawMaterial')
-    operations = Set('Operation')
-    delivery_schedules = Set('DeliverySchedule')
-
-class DocumentReference(db.Entity):
-    document_reference_id = PrimaryKey(int, auto=True)
-    order = Required(MasterOrder)
-    document_type = Required(str)  # e.g., "OARC Rev", "Drawing No", etc.
-    document_number = Required(str)
-    revision = Required(str, default='--')
-
-class RawMaterial(db.Entity):
-    raw_material_id = PrimaryKey(int, auto=True)
-    order = Required(MasterOrder)
-    sl_no = Required(str)
-    child_part_no = Required(str)
-    description = Required(str)
-    qty_per_set = Required(float)
-    uom = Required(str)
-    total_qty = Required(float)
-    is_available = Required(bool, default=True)
-
-class WorkCenter(db.Entity):
-    work_center_id = PrimaryKey(int, auto=True)
-    work_center_code = Required(str, unique=True)
-    description = Optional(str)
-    machines = Set('WorkCenterMachine')
-    operations = Set('Operation')
-
-class WorkCenterMachine(db.Entity):
-    machine_id = PrimaryKey(int, auto=True)
-    work_center = Required(WorkCenter)
-    machine_name = Required(str)
-    status = Optional(str)  # e.g., "Active", "Maintenance", "Inactive"
-
-class Operation(db.Entity):
-    operation_id = PrimaryKey(int, auto=True)
-    order = Required(MasterOrder)
-    work_center = Required(WorkCenter)
-    operation_number = Required(int)
-    operation_description = Required(str)
-    setup_time = Required(float)
-    per_piece_time = Required(float)
-    jump_quantity = Required(int)
-    total_quantity = Required(int)
-    allowed_time = Required(float)
-    actual_time = Optional(float)
-    confirmation_number = Optional(str)
-
-class DeliverySchedule(db.Entity):
-    delivery_schedule_id = PrimaryKey(int, auto=True)
-    order = Required(MasterOrder)
-    scheduled_delivery_date = Required(date)
-    actual_delivery_date = Optional(date)
-    delivery_status = Required(str)  # e.g., "Scheduled", "In Transit", "Delivered"
+from pony.orm import Database, Required, Optional, PrimaryKey, Set, Json, composite_index
+from datetime import date, datetime
+import itertools
+from app.database.config import DatabaseSettings, load_settings
+
+def define_entities(db: Database):
+    """
+    Declare the entities on db. Called once for the primary database and once for each read
+    replica, since a Pony entity belongs to a single Database.
+    """
+    class MasterOrder(db.Entity):
+        order_id = PrimaryKey(int, auto=True)
+        project_name = Required(str)
+        part_number = Required(str)
+        wbs = Required(str)
+        sale_order = Required(str)
+        part_description = Required(str)
+        total_operations = Required(int)
+        plant = Required(str)
+        routing_sequence_no = Required(int)
+        required_quantity = Required(int)
+        launched_quantity = Required(int)
+        production_order_no = Required(str, unique=True)
+        # Relationships
+        document_references = Set('DocumentReference')
+        raw_materials = Set('RawMaterial')
+        operations = Set('Operation')
+        delivery_schedules = Set('DeliverySchedule')
+        ingested_documents = Set('IngestedDocument')
+
+    class DocumentReference(db.Entity):
+        document_reference_id = PrimaryKey(int, auto=True)
+        order = Required(MasterOrder)
+        document_type = Required(str)  # e.g., "OARC Rev", "Drawing No", etc.
+        document_number = Required(str)
+        revision = Required(str, default='--')
+
+    class RawMaterial(db.Entity):
+        raw_material_id = PrimaryKey(int, auto=True)
+        order = Required(MasterOrder)
+        sl_no = Required(str)
+        child_part_no = Required(str)
+        description = Required(str)
+        qty_per_set = Required(float)
+        uom = Required(str)
+        total_qty = Required(float)
+        is_available = Required(bool, default=True)
+
+    class WorkCenter(db.Entity):
+        work_center_id = PrimaryKey(int, auto=True)
+        work_center_code = Required(str, unique=True)
+        description = Optional(str)
+        machines = Set('WorkCenterMachine')
+        operations = Set('Operation')
+
+    class WorkCenterMachine(db.Entity):
+        machine_id = PrimaryKey(int, auto=True)
+        work_center = Required(WorkCenter)
+        machine_name = Required(str)
+        status = Optional(str)  # e.g., "Active", "Maintenance", "Inactive"
+        composite_index(work_center, status)
+
+    class Operation(db.Entity):
+        operation_id = PrimaryKey(int, auto=True)
+        order = Required(MasterOrder)
+        work_center = Required(WorkCenter)
+        operation_number = Required(int)
+        operation_description = Required(str)
+        setup_time = Required(float)
+        per_piece_time = Required(float)
+        jump_quantity = Required(int)
+        total_quantity = Required(int)
+        allowed_time = Required(float)
+        actual_time = Optional(float)
+        confirmation_number = Optional(str)
+        # Operations of an order or a work center in routing order
+        composite_index(order, operation_number)
+        composite_index(work_center, operation_number)
+
+    class DeliverySchedule(db.Entity):
+        delivery_schedule_id = PrimaryKey(int, auto=True)
+        order = Required(MasterOrder)
+        scheduled_delivery_date = Required(date)
+        actual_delivery_date = Optional(date)
+        delivery_status = Required(str)  # e.g., "Scheduled", "In Transit", "Delivered"
+
+    class IngestedDocument(db.Entity):
+        content_hash = PrimaryKey(str)  # SHA-256 of the PDF bytes
+        production_order_no = Optional(str, index=True)
+        order = Optional(MasterOrder)
+        data = Required(Json)  # Extracted details, as returned by extract_oarc_details
+        ingested_at = Required(datetime, default=datetime.now)
+
+    class DataVersion(db.Entity):
+        name = PrimaryKey(str)
+        version = Required(int, size=64)
+
+    return db
+
+# The primary database, which takes every write
+db = define_entities(Database())
+MasterOrder = db.MasterOrder
+DocumentReference = db.DocumentReference
+RawMaterial = db.RawMaterial
+WorkCenter = db.WorkCenter
+WorkCenterMachine = db.WorkCenterMachine
+Operation = db.Operation
+DeliverySchedule = db.DeliverySchedule
+IngestedDocument = db.IngestedDocument
+DataVersion = db.DataVersion
+
+# Read replicas bound by init_database, used in turn by read_database
+replicas = []
+_replica_turns = itertools.count()
+
+def read_database() -> Database:
+    """
+    The database for reads that tolerate replication lag: the next read replica, or the primary
+    when none is configured. Query its entities, e.g. read_database().Operation.
+    """
+    if not replicas:
+        return db
+    return replicas[next(_replica_turns) % len(replicas)]
+
+# Version of the rows the schedule is planned from: MasterOrder, Operation and WorkCenterMachine
+SCHEDULE_DATA = "schedule"
+
+def get_data_version(name=SCHEDULE_DATA, database=db):
+    """
+    Current version of name, 0 before the first write. Must be called inside a db_session.
+    """
+    row = database.DataVersion.get(name=name)
+    return row.version if row else 0
+
+def bump_data_version(name=SCHEDULE_DATA):
+    """
+    Increase the version of name and return it. Call it in the db_session that writes the rows
+    it covers, so the new version commits together with them.
+    """
+    row = DataVersion.get_for_update(name=name)
+    if row is None:
+        row = DataVersion(name=name, version=1)
+    else:
+        row.version += 1
+    return row.version
 
 # Database connection setup
-def init_database():
-    from os import getenv
-    from dotenv import load_dotenv
-    
-    load_dotenv()  # Load environment variables
-    
+def init_database(settings: DatabaseSettings = None, create_tables: bool = None):
+    """
+    Bind the primary database and a Database per configured read replica. Missing tables are
+    created when create_tables is set, by default when DB_MIGRATE is; otherwise the mapping
+    trusts the schema and runs no queries.
+    """
+    settings = settings or load_settings()
+    if create_tables is None:
+        create_tables = settings.migrate
     if not db.provider:
-        db.bind(
-            provider='postgres',
-            user=getenv('DB_USER'),
-            password=getenv('DB_PASSWORD'),
-            host=getenv('DB_HOST'),
-            database=getenv('DB_NAME'),
-            port=getenv('DB_PORT')
-        )
-        db.generate_mapping(create_tables=True)
\ No newline at end of file
+        db.bind(provider='postgres', **settings.bind_arguments())
+        db.generate_mapping(create_tables=create_tables, check_tables=create_tables)
+        for host in settings.replica_hosts:
+            replica = define_entities(Database())
+            replica.bind(provider='postgres', **settings.bind_arguments(host))
+            replica.generate_mapping(check_tables=False)  # The schema is managed on the primary
+            replicas.append(replica)
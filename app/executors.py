@@ -0,0 +1,71 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from app.database.config import load_settings
+
+# Threads that run database work for async routes. Pony keeps one connection per thread, so
+# DB_POOL_SIZE also bounds the connections the API opens to each database.
+DB_WORKERS = load_settings().pool_size
+
+# Processes for CPU-heavy planning, started on first use
+PLAN_WORKERS = int(os.getenv("PLAN_WORKERS", "0")) or min(os.cpu_count() or 1, 4)
+
+db_executor = ThreadPoolExecutor(DB_WORKERS, thread_name_prefix="db")
+
+_cpu_executor = None
+_cpu_executor_lock = threading.Lock()
+
+def get_cpu_executor() -> ProcessPoolExecutor:
+    global _cpu_executor
+    with _cpu_executor_lock:
+        if _cpu_executor is None:
+            # Spawned workers do not inherit the threads and open connections of the API process
+            _cpu_executor = ProcessPoolExecutor(PLAN_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _cpu_executor
+
+async def run_db(func, *args, **kwargs):
+    """
+    Run func, which opens its own db_session, on the database threads without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
+def discard_cpu_executor(executor: ProcessPoolExecutor):
+    """
+    Drop executor, whose workers died, so the next get_cpu_executor starts a new pool. Does
+    nothing if another caller already replaced it.
+    """
+    global _cpu_executor
+    with _cpu_executor_lock:
+        if _cpu_executor is executor:
+            _cpu_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+async def run_cpu(func, *args, **kwargs):
+    """
+    Run func in a worker process. func must be a module-level function, and its arguments and
+    result picklable plain data. If a worker dies (for example killed for running out of
+    memory) the pool is replaced and func retried once before BrokenProcessPool is raised.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    for attempt in range(2):
+        executor = get_cpu_executor()
+        try:
+            return await loop.run_in_executor(executor, call)
+        except BrokenProcessPool:
+            discard_cpu_executor(executor)
+            if attempt:
+                raise
+
+def shutdown_executors():
+    global _cpu_executor
+    db_executor.shutdown(wait=False, cancel_futures=True)
+    with _cpu_executor_lock:
+        if _cpu_executor is not None:
+            _cpu_executor.shutdown(wait=True, cancel_futures=True)
+            _cpu_executor = None
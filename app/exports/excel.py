@@ -0,0 +1,62 @@
+import io
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_FONT = Font(color="FFFFFF", bold=True)
+
+def column_widths(df: pd.DataFrame) -> list:
+    """
+    Width of each column: its longest header or value as text, plus padding.
+    """
+    widths = []
+    for column in df.columns:
+        longest = df[column].astype(str).str.len().max() if len(df) else 0
+        widths.append(max(len(str(column)), int(longest)) + 2)
+    return widths
+
+def header_row(ws, headers) -> list:
+    cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cells.append(cell)
+    return cells
+
+def write_sheet(wb: Workbook, title: str, headers, rows, widths=None):
+    """
+    Append a write-only sheet with a styled header row. Rows are written as they are consumed,
+    so they can come from a generator.
+    """
+    ws = wb.create_sheet(title)
+    # Column widths must be set before the first row is written
+    for index, width in enumerate(widths or [], 1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+    ws.append(header_row(ws, headers))
+    for row in rows:
+        ws.append(row)
+    return ws
+
+def write_dataframe_sheet(wb: Workbook, title: str, df: pd.DataFrame):
+    write_sheet(wb, title, list(df.columns), df.itertuples(index=False, name=None), column_widths(df))
+
+def workbook_bytes(wb: Workbook) -> bytes:
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+def create_excel_file(document_details, operations_df, raw_materials_df=None) -> bytes:
+    """
+    OARC report workbook, with the document details, operations and optional raw materials
+    sheets, as xlsx bytes. Built in write-only mode in memory.
+    """
+    wb = Workbook(write_only=True)
+    write_sheet(wb, "Document Details", ["Field", "Value"], document_details.items(), [20, 40])
+    write_dataframe_sheet(wb, "Operations", operations_df)
+    if raw_materials_df is not None:
+        write_dataframe_sheet(wb, "Raw Materials", raw_materials_df)
+    return workbook_bytes(wb)
@@ -0,0 +1,96 @@
+import csv
+import io
+import itertools
+import numpy as np
+from openpyxl import Workbook
+from app.exports.excel import write_sheet, workbook_bytes
+
+# Rows per CSV chunk and per Parquet row group
+EXPORT_CHUNK_ROWS = 65536
+
+SCHEDULE_COLUMNS = {
+    "piece": ["part_number", "operation_id", "operation_description", "machine", "start_time", "end_time", "launched_quantity"],
+    "batch": ["part_number", "operation_id", "operation_description", "machine", "start_time", "end_time", "quantity_start", "quantity_end"],
+    "shift": ["part_number", "operation_id", "operation_description", "machine", "start_time", "end_time", "quantity_start", "quantity_end", "batches"],
+}
+
+# Rows per worksheet in Excel, the header row included
+XLSX_MAX_ROWS = 1_048_576
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def rechunk(blocks, rows=EXPORT_CHUNK_ROWS):
+    """
+    Regroup column blocks (dicts of equal-length arrays with the same keys) into blocks of
+    about the given number of rows, so per-operation blocks are not written one by one.
+    """
+    pending, pending_rows = [], 0
+    for block in blocks:
+        pending.append(block)
+        pending_rows += len(next(iter(block.values())))
+        if pending_rows >= rows:
+            yield {name: np.concatenate([chunk[name] for chunk in pending]) for name in block}
+            pending, pending_rows = [], 0
+    if pending:
+        yield {name: np.concatenate([chunk[name] for chunk in pending]) for name in pending[0]}
+
+def _block_rows(block):
+    # datetime64 columns become datetime objects through tolist, one chunk at a time
+    return zip(*[values.tolist() for values in block.values()])
+
+def iter_csv(blocks, columns):
+    """
+    Yield CSV text chunk by chunk, a header line first.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for block in rechunk(blocks):
+        writer.writerows(_block_rows(block))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def xlsx_bytes(blocks, columns) -> bytes:
+    """
+    Write-only workbook filled as the blocks are consumed. Rows past the sheet size limit of
+    Excel continue on "Schedule 2", "Schedule 3" and so on.
+    """
+    wb = Workbook(write_only=True)
+    rows = iter(row for block in rechunk(blocks) for row in _block_rows(block))
+    widths = [max(len(column) + 2, 20 if column.endswith("_time") else 12) for column in columns]
+    sheet = 1
+    first = next(rows, None)
+    while True:
+        sheet_rows = [] if first is None else itertools.chain([first], itertools.islice(rows, XLSX_MAX_ROWS - 2))
+        write_sheet(wb, "Schedule" if sheet == 1 else f"Schedule {sheet}", columns, sheet_rows, widths)
+        first = next(rows, None)
+        if first is None:
+            break
+        sheet += 1
+    return workbook_bytes(wb)
+
+def parquet_bytes(blocks, columns) -> bytes:
+    """
+    Parquet file with one row group per chunk of rows. Needs pyarrow, which is optional and
+    imported here so the API starts without it.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    buffer = io.BytesIO()
+    writer = None
+    for block in rechunk(blocks):
+        table = pa.table({name: block[name] for name in columns})
+        if writer is None:
+            writer = pq.ParquetWriter(buffer, table.schema)
+        writer.write_table(table)
+    if writer is None:
+        writer = pq.ParquetWriter(buffer, pa.schema([(name, pa.string()) for name in columns]))
+    writer.close()
+    return buffer.getvalue()
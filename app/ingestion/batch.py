@@ -0,0 +1,264 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+import argparse
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import uuid
+import zipfile
+from app.ingestion.oarc_parser import extract_oarc_details
+from app.ingestion.store import content_hash, ingested_content_hashes, load_ingested_document, store_oarc_document
+
+logger = logging.getLogger(__name__)
+
+def resolve_ingestion_path(path) -> Path:
+    """
+    path (relative, or absolute) resolved under INGESTION_ROOT, the only directory the API
+    ingests server files from. Raises ValueError when no root is configured or path leaves it.
+    """
+    root = os.getenv("INGESTION_ROOT")
+    if not root:
+        raise ValueError("Batch ingestion of server paths is disabled; set INGESTION_ROOT to enable it")
+    root = Path(root).resolve()
+    resolved = (root / path).resolve()
+    if not resolved.is_relative_to(root):
+        raise ValueError(f"{path} is outside the ingestion root")
+    if not resolved.exists():
+        raise ValueError(f"{path} does not exist")
+    return resolved
+
+def list_pdf_sources(path) -> list:
+    """
+    The PDFs of a directory (searched recursively) or of a zip archive, as (name, path, member)
+    sources; member is the archive entry, or None for plain files.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return [
+            (str(pdf.relative_to(path)), str(pdf), None)
+            for pdf in sorted(path.rglob("*"))
+            if pdf.is_file() and pdf.suffix.lower() == ".pdf"
+        ]
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return [
+                (member, str(path), member)
+                for member in sorted(archive.namelist())
+                if member.lower().endswith(".pdf") and not member.endswith("/")
+            ]
+    raise ValueError(f"{path} is neither a directory nor a zip archive")
+
+# Content hashes already ingested, handed to each worker once by the pool initializer
+_known_hashes = frozenset()
+
+def _set_known_hashes(known_hashes):
+    global _known_hashes
+    _known_hashes = known_hashes
+
+def extract_pdf_source(source) -> dict:
+    """
+    Read and parse one source in a worker process, skipping the parse for content already
+    ingested. Failures are reported in the result instead of raised, so one bad file does not
+    stop the batch.
+    """
+    name, path, member = source
+    started = time.perf_counter()
+    result = {"file": name, "content_hash": None, "data": None, "cached": False, "error": None}
+    try:
+        if member is None:
+            with open(path, "rb") as pdf:
+                content = pdf.read()
+        else:
+            with zipfile.ZipFile(path) as archive:
+                content = archive.read(member)
+        result["content_hash"] = content_hash(content)
+        if result["content_hash"] in _known_hashes:
+            result["cached"] = True
+        else:
+            result["data"] = extract_oarc_details(io.BytesIO(content))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["extract_seconds"] = time.perf_counter() - started
+    return result
+
+def default_workers() -> int:
+    return int(os.getenv("INGESTION_WORKERS", "0")) or os.cpu_count() or 1
+
+def extract_batch(path, max_workers=None, save=True, on_result=None) -> list:
+    """
+    Extract every PDF under path in parallel across processes and, when save is set, store each
+    document as soon as it is parsed; PDFs ingested before are not parsed again. Returns one
+    result per file with its extract and save timings, order id and any error; on_result is
+    called with each result as it lands. The extracted data of a result is dropped once it is
+    stored, and only kept when save is not set.
+    """
+    sources = list_pdf_sources(path)
+    results = []
+    if not sources:
+        return results
+
+    known_hashes = frozenset()
+    if save:
+        known_hashes = frozenset(ingested_content_hashes())
+
+    # Spawned workers do not inherit the threads and open connections of the calling process
+    workers = min(max_workers or default_workers(), len(sources))
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_set_known_hashes,
+        initargs=(known_hashes,)
+    ) as executor:
+        futures = [executor.submit(extract_pdf_source, source) for source in sources]
+        for future in as_completed(futures):
+            result = future.result()
+            result["order_id"] = None
+            result["existing_order"] = False
+            result["save_seconds"] = 0.0
+            if save and result["error"] is None:
+                started = time.perf_counter()
+                try:
+                    # Known content only needs its order id; duplicates within the batch are
+                    # caught by the content hash when stored
+                    if result["cached"]:
+                        stored = load_ingested_document(result["content_hash"])
+                    else:
+                        stored = store_oarc_document(result["data"], result["content_hash"])
+                    result["order_id"] = stored.order_id
+                    result["cached"] = stored.cached
+                    result["existing_order"] = stored.existing_order
+                    result["data"] = None
+                except Exception as e:
+                    result["error"] = f"{type(e).__name__}: {e}"
+                    logger.error(f"Error saving {result['file']}: {e}")
+                    logger.error(traceback.format_exc())
+                result["save_seconds"] = time.perf_counter() - started
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return results
+
+class BatchJob:
+    """
+    A batch ingestion running in a background thread, so callers can poll its progress.
+    """
+
+    def __init__(self, path, max_workers=None, save=True):
+        self.job_id = uuid.uuid4().hex
+        self.path = str(path)
+        self.total = len(list_pdf_sources(path))
+        self.max_workers = max_workers
+        self.save = save
+        self.status = "pending"
+        self.error = None
+        self.results = []
+        self.started_at = None
+        self.finished_at = None
+        self._thread = threading.Thread(target=self._run, name=f"ingestion-{self.job_id}", daemon=True)
+
+    def start(self):
+        self.started_at = datetime.now()
+        self.status = "running"
+        self._thread.start()
+        return self
+
+    def _add_result(self, result):
+        # Only the outcome is reported, so the extracted data is not kept for the life of the job
+        self.results.append({key: value for key, value in result.items() if key != "data"})
+
+    def _run(self):
+        try:
+            extract_batch(self.path, self.max_workers, self.save, self._add_result)
+            self.status = "finished"
+        except Exception as e:
+            logger.error(f"Batch ingestion of {self.path} failed: {e}")
+            logger.error(traceback.format_exc())
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = datetime.now()
+
+    def summary(self, include_files=True) -> dict:
+        results = list(self.results)
+        summary = {
+            "job_id": self.job_id,
+            "path": self.path,
+            "status": self.status,
+            "error": self.error,
+            "total": self.total,
+            "processed": len(results),
+            "failed": sum(1 for result in results if result["error"]),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_files:
+            summary["files"] = results
+        return summary
+
+# Finished jobs are kept for polling for JOB_TTL seconds, and at most JOBS_KEPT of them
+JOB_TTL = int(os.getenv("INGESTION_JOB_TTL", "3600"))
+JOBS_KEPT = int(os.getenv("INGESTION_JOBS_KEPT", "100"))
+
+# Jobs started in this process, by id, oldest first
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def _prune_jobs():
+    """
+    Forget finished jobs past JOB_TTL and the oldest finished ones beyond JOBS_KEPT; running
+    jobs are always kept. Call with _jobs_lock held.
+    """
+    now = datetime.now()
+    finished = [job for job in _jobs.values() if job.finished_at is not None]
+    expired = [job for job in finished if (now - job.finished_at).total_seconds() > JOB_TTL]
+    live = [job for job in finished if job not in expired]
+    for job in expired + live[:max(len(live) - JOBS_KEPT, 0)]:
+        del _jobs[job.job_id]
+
+def start_batch_job(path, max_workers=None, save=True) -> BatchJob:
+    job = BatchJob(path, max_workers, save)
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[job.job_id] = job
+    return job.start()
+
+def get_batch_job(job_id):
+    with _jobs_lock:
+        _prune_jobs()
+        return _jobs.get(job_id)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract a directory or zip of OARC PDFs in parallel.")
+    parser.add_argument("path", help="Directory (searched recursively) or zip archive of PDFs")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: INGESTION_WORKERS or CPU count)")
+    parser.add_argument("--no-save", action="store_true", help="Only extract; do not write to the database")
+    args = parser.parse_args(argv)
+
+    if not args.no_save:
+        from app.database.models import init_database
+        init_database()
+
+    def report(result):
+        if result["error"]:
+            status = f"FAILED {result['error']}"
+        elif result["cached"]:
+            status = f"already ingested, order {result['order_id']}"
+        elif result["existing_order"]:
+            status = f"existing order {result['order_id']}"
+        else:
+            status = f"order {result['order_id']}" if result["order_id"] else "ok"
+        print(f"{result['extract_seconds']:8.3f}s {result['save_seconds']:8.3f}s  {result['file']}  {status}", flush=True)
+
+    started = time.perf_counter()
+    results = extract_batch(args.path, args.workers, not args.no_save, report)
+    failed = sum(1 for result in results if result["error"])
+    print(f"{len(results)} files, {failed} failed, {time.perf_counter() - started:.2f}s")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,219 @@
+import re
+
+# Header fields, searched over the whole document text since a field can wrap onto the next line
+PROJECT_PATTERN = re.compile(r"Project Name\s*:([^:]+)Part No\s*:([^W]+)WBS\s*:\s*([^\n]+)")
+SALE_PATTERN = re.compile(r"Sale order\s*:([^:]+)Part Desc\s*:([^T]+)")
+PLANT_PATTERN = re.compile(r"Plant\s*:([^R]+)Rtg Seq No\s*:([^S]+)Sequence No\s*:([^\n]+)")
+QUANTITY_PATTERN = re.compile(r"Required Qty\s*:([^L]+)Launched Qty\s*:([^P]+)Prod Order No\s*:([^\n]+)")
+
+OPERATION_PATTERN = re.compile(r'(\d{4})\s+([A-Z0-9-]+)\s+(\d+\.?\d*)\s+(\d+\.?\d*)\s+(\d+)\s+(\d+)\s+(\d+\.?\d*)\s*(\d*)')
+PLANT_NUMBER_PATTERN = re.compile(r'^(\d+)\s*(.*)')
+RAW_MATERIAL_PATTERN = re.compile(r'(\d{4})\s+(\w+)\s+([\w\s\-\.]+)\s+([\d\.]+)\s+(\w+)\s+([\d\.]+)')
+
+# Document details in the long text of the verification operation: (key, literal every match
+# contains, pattern). The literal is checked first so absent documents cost a substring search.
+DOCUMENT_PATTERNS = [
+    (key, literal, re.compile(pattern)) for key, literal, pattern in [
+        ("OARC Rev", "OARC Rev.", r"OARC Rev\.\s*:\s*([^\n]+)"),
+        ("Part Rev", "Part Rev.", r"Part Rev\.\s*:\s*([^\n]+)"),
+        ("Drawing No", "Drawing No.", r"Drawing No\.\s*:\s*([^R]+)Rev\.\s*:\s*([^\n]+)"),
+        ("Cad No", "Cad No.", r"Cad No\.\s*:\s*([^R]+)Rev\.\s*:\s*([^\n]+)"),
+        ("Stage Verification Doc", "Stage Verification Document No.", r"Stage Verification Document No\.\s*:\s*([^R]+)Rev\.\s*:\s*([^\n]+)"),
+        ("Final Verification Doc", "Final Verification Document No.", r"Final Verification Document No\.\s*:\s*([^R]+)Rev\.\s*:\s*([^\n]+)"),
+        ("Raw Material Index Doc", "Raw Material Index", r"Raw Material Index\s+Doc No\.\s*:\s*([\w\-]+)\s+Rev\.\s*:\s*(\d+)"),
+        ("Plating Inspection Doc", "Plating inspection Doc No.", r"Plating inspection Doc No\.\s*:([\w\-]+)\s+Rev\.\s*:\s*(\d+)"),
+        ("MPP Doc", "MPP Doc No.", r"MPP Doc No\.\s*:\s*([^R]+)Rev\.\s*:\s*([^\n]+)"),
+    ]
+]
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def clean_text(text):
+    # Remove multiple spaces and clean up the text
+    text = WHITESPACE_PATTERN.sub(' ', text)
+    return text.strip()
+
+def read_pdf_text(pdf_content) -> str:
+    """
+    Text of every page of a PDF, each followed by a newline.
+    """
+    import PyPDF2  # Only needed once a PDF is read; the parser itself works on text
+
+    pdf_reader = PyPDF2.PdfReader(pdf_content)
+    return "".join([page.extract_text() + "\n" for page in pdf_reader.pages])
+
+def extract_oarc_details(pdf_content):
+    return parse_oarc_text(read_pdf_text(pdf_content))
+
+def parse_document_details(long_text: str) -> dict:
+    """
+    Document numbers and revisions listed in the long text of a verification operation.
+    """
+    doc_details = {}
+    for key, literal, pattern in DOCUMENT_PATTERNS:
+        if literal not in long_text:
+            continue
+        match = pattern.search(long_text)
+        if match:
+            if len(match.groups()) == 2:
+                doc_details[key] = {
+                    "Number": match.group(1).strip(),
+                    "Revision": match.group(2).strip()
+                }
+            else:
+                doc_details[key] = match.group(1).strip()
+    return doc_details
+
+def parse_oarc_text(text: str) -> dict:
+    """
+    Parse the text of an OARC document into its header fields, operations with their long text,
+    document verification details and raw materials.
+
+    The lines are read once: the operations table and the raw materials table are two
+    independent states of the same sweep.
+    """
+    # Initialize dictionary to store extracted data
+    data = {
+        "Project Name": "",
+        "Sale Order": "",
+        "Part No": "",
+        "Part Desc": "",
+        "Required Qty": "",
+        "Plant": "",
+        "WBS": "",
+        "Rtg Seq No": "",
+        "Sequence No": "",
+        "Launched Qty": "",
+        "Prod Order No": "",
+        "Operations": [],
+        "Document Verification": {},
+        "Raw Materials": []
+    }
+
+    # Project Name and Part No
+    project_match = PROJECT_PATTERN.search(text)
+    if project_match:
+        data["Project Name"] = project_match.group(1).strip()
+        data["Part No"] = project_match.group(2).strip()
+        data["WBS"] = project_match.group(3).strip()
+
+    # Sale order and Part Desc
+    sale_match = SALE_PATTERN.search(text)
+    if sale_match:
+        data["Sale Order"] = sale_match.group(1).strip()
+        data["Part Desc"] = sale_match.group(2).strip()
+
+    # Plant and sequence numbers
+    plant_match = PLANT_PATTERN.search(text)
+    if plant_match:
+        data["Plant"] = plant_match.group(1).strip()
+        data["Rtg Seq No"] = plant_match.group(2).strip()
+        data["Sequence No"] = plant_match.group(3).strip()
+
+    # Required Qty, Launched Qty, and Prod Order No
+    qty_match = QUANTITY_PATTERN.search(text)
+    if qty_match:
+        data["Required Qty"] = qty_match.group(1).strip()
+        data["Launched Qty"] = qty_match.group(2).strip()
+        data["Prod Order No"] = qty_match.group(3).strip()
+
+    lines = [line.strip() for line in text.split('\n')]
+    operations = data["Operations"]
+    raw_materials = data["Raw Materials"]
+    operation_started = False
+    current_operation = None
+    long_text = None  # Lines of the long text, once a "Long Text:" marker has been seen
+    raw_materials_started = False
+
+    for i, line in enumerate(lines):
+        # Raw materials table: from its header row to the SPECIAL NOTE section
+        if "Item" in line and "Child Part No" in line:
+            raw_materials_started = True
+        elif raw_materials_started:
+            if not line.startswith('_'):
+                raw_match = RAW_MATERIAL_PATTERN.match(line)
+                if raw_match:
+                    sl_no, child_part_no, description, qty_per_set, uom, total_qty = raw_match.groups()
+                    raw_materials.append({
+                        "Sl.No": sl_no,
+                        "Child Part No": child_part_no,
+                        "Description": description.strip(),
+                        "Qty Per Set": qty_per_set,
+                        "UoM": uom,
+                        "Total Qty": total_qty
+                    })
+            if line.startswith('SPECIAL NOTE'):
+                raw_materials_started = False
+
+        # Operations table
+        if not line or line.startswith('_'):
+            continue
+
+        if "Oprn" in line and "Operation" in line:
+            operation_started = True
+            continue
+
+        if not operation_started:
+            continue
+
+        op_match = OPERATION_PATTERN.match(line)
+        if op_match:
+            if current_operation:
+                current_operation["Long Text"] = "\n".join(long_text) if long_text else ""
+                operations.append(current_operation)
+                if long_text is not None:
+                    long_text = []  # Once started, long text keeps collecting for later operations
+
+            # The next lines hold the plant number and the operation description
+            next_line = lines[i + 1] if i + 1 < len(lines) else ""
+            next_next_line = lines[i + 2] if i + 2 < len(lines) else ""
+
+            plant_number = ""
+            operation_desc = ""
+
+            if next_line:
+                plant_number_match = PLANT_NUMBER_PATTERN.match(next_line)
+                if plant_number_match:
+                    plant_number = plant_number_match.group(1)
+                    if plant_number_match.group(2):  # If there's text after the number
+                        operation_desc = plant_number_match.group(2)
+                    elif next_next_line and not next_next_line.startswith("Long Text"):
+                        operation_desc = next_next_line
+                else:
+                    operation_desc = next_line
+
+            oprn_no, work_center, setup_time, per_piece_time, jump_qty, total_qty, allowed_time, confirm_no = op_match.groups()
+            current_operation = {
+                "Oprn No": oprn_no,
+                "Wc/Plant": work_center,
+                "Plant Number": plant_number,
+                "Operation": operation_desc,
+                "Setup Time": setup_time,
+                "Per Pc Time": per_piece_time,
+                "Jmp Qty": jump_qty,
+                "Tot Qty": total_qty,
+                "Allowed Time": allowed_time,
+                "Confirm No": confirm_no,
+                "Long Text": ""
+            }
+        elif current_operation:
+            if "Long Text:" in line:
+                if long_text is None:
+                    long_text = []
+                continue
+
+            if long_text is not None:
+                long_text.append(line)
+
+    # Add the last operation if exists
+    if current_operation:
+        current_operation["Long Text"] = "\n".join(long_text) if long_text else ""
+        operations.append(current_operation)
+
+    # Document verification details come from the first verification operation
+    for operation in operations:
+        if "verification" in operation["Operation"].lower():
+            data["Document Verification"] = parse_document_details(operation["Long Text"])
+            break
+
+    return data
@@ -0,0 +1,191 @@
+from typing import NamedTuple, Optional
+import hashlib
+import io
+from pony.orm import db_session, flush, select
+from app.database.models import (
+    MasterOrder,
+    DocumentReference,
+    RawMaterial,
+    WorkCenter,
+    Operation,
+    IngestedDocument,
+    bump_data_version
+)
+from app.database.bulk import bulk_insert
+from app.ingestion.oarc_parser import extract_oarc_details
+
+class IngestionResult(NamedTuple):
+    data: dict
+    order_id: Optional[int]
+    content_hash: Optional[str]
+    cached: bool  # The same PDF bytes were ingested before: nothing was parsed or written
+    existing_order: bool  # An order with this production order number existed: no order rows were written
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+def _cached_result(document: IngestedDocument) -> IngestionResult:
+    return IngestionResult(
+        document.data.get_untracked(),
+        document.order.order_id if document.order else None,
+        document.content_hash,
+        True,
+        False,
+    )
+
+def load_ingested_document(digest: str) -> Optional[IngestionResult]:
+    """
+    The stored extraction of the PDF with this content hash, or None if it was never ingested.
+    """
+    with db_session:
+        document = IngestedDocument.get(content_hash=digest)
+        return _cached_result(document) if document else None
+
+def ingested_content_hashes() -> set:
+    """
+    Content hashes of every PDF ingested so far.
+    """
+    with db_session:
+        return set(select(document.content_hash for document in IngestedDocument))
+
+def find_master_order(production_order_no: str) -> Optional[MasterOrder]:
+    return MasterOrder.select(
+        lambda mo: mo.production_order_no == production_order_no
+    ).order_by(MasterOrder.order_id).first()
+
+def resolve_work_centers(operations: list) -> dict:
+    """
+    Map the work center codes of operations to work center ids with one IN query, inserting
+    the missing ones in a single statement. A new work center is described by its first operation.
+    """
+    descriptions = {}
+    for op in operations:
+        descriptions.setdefault(op["Wc/Plant"], op["Operation"])
+    codes = list(descriptions)
+    if not codes:
+        return {}
+
+    work_center_ids = dict(select(
+        (wc.work_center_code, wc.work_center_id) for wc in WorkCenter if wc.work_center_code in codes
+    ))
+    missing = [code for code in codes if code not in work_center_ids]
+    if missing:
+        bulk_insert(WorkCenter, [{"work_center_code": code, "description": descriptions[code]} for code in missing])
+        work_center_ids.update(select(
+            (wc.work_center_code, wc.work_center_id) for wc in WorkCenter if wc.work_center_code in missing
+        ))
+    return work_center_ids
+
+def save_oarc_details(data: dict) -> int:
+    """
+    Store the details extracted from one OARC document as a new master order with its
+    document references, raw materials and operations. Returns the new order id.
+
+    Child rows go in with multi-row INSERTs, so a document costs a handful of round trips
+    however many operations it has.
+    """
+    with db_session:
+        # Create master order
+        master_order = MasterOrder(
+            project_name=data["Project Name"],
+            sale_order=data["Sale Order"],
+            part_number=data["Part No"],
+            wbs=data["WBS"],
+            part_description=data["Part Desc"],
+            total_operations=len(data["Operations"]),
+            plant=data["Plant"],
+            routing_sequence_no=int(data["Rtg Seq No"]),
+            required_quantity=int(data["Required Qty"]),
+            launched_quantity=int(data["Launched Qty"]),
+            production_order_no=data["Prod Order No"]
+        )
+
+        flush()  # Child rows below reference the new order id
+        order_id = master_order.order_id
+
+        # Insert Document References
+        bulk_insert(DocumentReference, [
+            {
+                "order": order_id,
+                "document_type": doc_type,
+                "document_number": doc_info["Number"] if isinstance(doc_info, dict) else doc_info,
+                "revision": doc_info["Revision"] if isinstance(doc_info, dict) else '--'
+            }
+            for doc_type, doc_info in data["Document Verification"].items()
+        ])
+
+        # Insert Raw Materials
+        bulk_insert(RawMaterial, [
+            {
+                "order": order_id,
+                "sl_no": raw_mat["Sl.No"],
+                "child_part_no": raw_mat["Child Part No"],
+                "description": raw_mat["Description"],
+                "qty_per_set": float(raw_mat["Qty Per Set"]),
+                "uom": raw_mat["UoM"],
+                "total_qty": float(raw_mat["Total Qty"]),
+                "is_available": True
+            }
+            for raw_mat in data["Raw Materials"]
+        ])
+
+        # Insert Operations, creating the work centers they need
+        work_center_ids = resolve_work_centers(data["Operations"])
+        bulk_insert(Operation, [
+            {
+                "order": order_id,
+                "work_center": work_center_ids[op["Wc/Plant"]],
+                "operation_number": int(op["Oprn No"]),
+                "operation_description": op["Operation"],
+                "setup_time": float(op["Setup Time"]),
+                "per_piece_time": float(op["Per Pc Time"]),
+                "jump_quantity": int(op["Jmp Qty"]),
+                "total_quantity": int(op["Tot Qty"]),
+                "allowed_time": float(op["Allowed Time"]),
+                "actual_time": 0.0,  # Default value
+                "confirmation_number": op["Confirm No"]  # Empty when not confirmed, as Optional(str) stores it
+            }
+            for op in data["Operations"]
+        ])
+
+        bump_data_version()  # Invalidate cached schedules
+        return order_id
+
+def store_oarc_document(data: dict, digest: Optional[str] = None) -> IngestionResult:
+    """
+    Store extracted details once. A known content hash returns the stored result, and a production
+    order number that already has an order links the document to that order instead of creating
+    a second one. The extraction is kept under its content hash so later uploads skip parsing.
+    """
+    with db_session:
+        if digest:
+            document = IngestedDocument.get(content_hash=digest)
+            if document:
+                return _cached_result(document)
+
+        production_order_no = data["Prod Order No"]
+        master_order = find_master_order(production_order_no) if production_order_no else None
+        existing_order = master_order is not None
+        if not existing_order:
+            master_order = MasterOrder[save_oarc_details(data)]
+
+        if digest:
+            IngestedDocument(
+                content_hash=digest,
+                production_order_no=production_order_no or None,
+                order=master_order,
+                data=data
+            )
+        flush()
+        return IngestionResult(data, master_order.order_id, digest, False, existing_order)
+
+def ingest_oarc_pdf(content: bytes) -> IngestionResult:
+    """
+    Extract and store an OARC PDF, keyed on the SHA-256 of its bytes: a PDF seen before is a
+    cache hit that neither parses nor writes.
+    """
+    digest = content_hash(content)
+    cached = load_ingested_document(digest)
+    if cached is not None:
+        return cached
+    return store_oarc_document(extract_oarc_details(io.BytesIO(content)), digest)
@@ -1,10 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers.operation import router as operation_router  # Ensure this line imports the router correctly
+from app.routers.ingestion import router as ingestion_router
 from app.database.models import init_database  # Import the init_database function
+from app.database.config import load_settings
+from app.executors import shutdown_executors
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect and map the entities before taking traffic. Tables and indexes are only created
+    # when DB_MIGRATE is set, so restarts and reloads skip the schema checks.
+    settings = load_settings()
+    init_database(settings)
+    if settings.migrate:
+        from app.database.migrations import apply_indexes
+        apply_indexes()
+    yield
+    # Stop the database threads and planning processes with the server
+    shutdown_executors()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS Configuration
 origins = ["*"]
@@ -17,7 +34,5 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the database
-init_database()
-
 app.include_router(operation_router, prefix="/api")
+app.include_router(ingestion_router, prefix="/api")
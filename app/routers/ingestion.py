@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from typing import Optional
+from pony.orm import Database
+from app.ingestion.batch import default_workers, resolve_ingestion_path, start_batch_job, get_batch_job
+from app.routers.operation import get_database_connection
+import logging
+import traceback
+
+# Create the router
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+class BatchIngestionRequest(BaseModel):
+    path: str  # Directory or zip archive of OARC PDFs on the server, under INGESTION_ROOT
+    workers: Optional[int] = Field(None, ge=1)  # At most INGESTION_WORKERS or the CPU count
+    save: bool = True
+
+@router.post("/ingestion/batches", status_code=202)
+def create_ingestion_batch(request: BatchIngestionRequest, db: Database = Depends(get_database_connection)):
+    """
+    Start extracting a directory or zip of OARC PDFs in the background. Poll the returned job
+    with GET /ingestion/batches/{job_id}. Only paths under INGESTION_ROOT are accepted.
+    """
+    try:
+        workers = min(request.workers or default_workers(), default_workers())
+        job = start_batch_job(resolve_ingestion_path(request.path), workers, request.save)
+        return job.summary(include_files=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error starting batch ingestion: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+@router.get("/ingestion/batches/{job_id}")
+def get_ingestion_batch(job_id: str):
+    """
+    Progress of a batch ingestion with per-file timings and failures.
+    """
+    job = get_batch_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch {job_id} not found")
+    return job.summary()
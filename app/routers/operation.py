@@ -1,11 +1,36 @@
-from fastapi import FastAPI, HTTPException, APIRouter, Depends
-from pydantic import BaseModel
-from typing import List, Dict
-from datetime import datetime, timedelta
-from pony.orm import db_session, select, Database
-from app.database.models import Operation, WorkCenterMachine, WorkCenter
+from fastapi import FastAPI, HTTPException, APIRouter, Depends, Query, Header, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import TYPE_CHECKING, List, Dict, Literal, NamedTuple, Optional, Union
+from datetime import date, datetime
+from pony.orm import db_session, select, count, Database
+from app.database.models import (
+    MasterOrder,
+    DocumentReference,
+    RawMaterial,
+    WorkCenter,
+    WorkCenterMachine,
+    Operation,
+    DeliverySchedule,
+    get_data_version,
+    bump_data_version,
+    read_database
+)
+from app.cache import LRUCache
+from app.executors import run_db, run_cpu
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import json
 import logging
+import os
+import threading
 import traceback
+import uuid
+
+# The planning and export modules pull in NumPy, pandas and openpyxl; they are imported by the
+# routes that use them, so the API starts without loading them
+if TYPE_CHECKING:
+    from app.algorithms.incremental import IncrementalScheduler
 
 # Create the router
 router = APIRouter()
@@ -24,6 +49,29 @@ class SchedulingResponse(BaseModel):
     end_time: datetime
     launched_quantity: int
 
+# Response model for run-length (batch) scheduling data
+class SchedulingBatchResponse(BaseModel):
+    part_number: str
+    operation_id: int
+    operation_description: str
+    machine: str  # Machine name
+    start_time: datetime
+    end_time: datetime
+    quantity_start: int
+    quantity_end: int
+
+# Response model for shift-level scheduling data: the batches of an operation run on a machine within one shift
+class SchedulingShiftResponse(BaseModel):
+    part_number: str
+    operation_id: int
+    operation_description: str
+    machine: str  # Machine name
+    start_time: datetime
+    end_time: datetime
+    quantity_start: int
+    quantity_end: int
+    batches: int
+
 # Dependency to ensure database connection
 def get_database_connection():
     from app.database.models import db, init_database
@@ -35,78 +83,552 @@ def get_database_connection():
         logger.error(f"Database connection error: {e}")
         raise HTTPException(status_code=500, detail=f"Database connection failed: {e}")
 
-@router.get("/scheduled-operations", response_model=List[SchedulingResponse])
-def get_scheduled_operations(
+class KeptPlan(NamedTuple):
+    scheduler: Optional["IncrementalScheduler"]
+    version: int  # Data version the plan reflects
+    token: str  # Identifies this build, so ETags differ across rebuilds and restarts
+
+# Last plan, kept so shop-floor confirmations only replan what they move. It is rebuilt when the
+# schedule data version changes through any other write, or on request with replan=true.
+# _plan_lock guards swapping it; _plan_build_lock lets one request rebuild while the others wait.
+_plan_lock = threading.Lock()
+_plan_build_lock = asyncio.Lock()
+_kept_plan = None
+
+# Serialized schedule responses of the kept plan keyed by their ETag, across the different query
+# parameters, bounded by count and total size. Emptied whenever the kept plan is replaced.
+schedule_cache = LRUCache(
+    int(os.getenv("SCHEDULE_CACHE_SIZE", "16")),
+    int(os.getenv("SCHEDULE_CACHE_MB", "64")) * 1024 * 1024
+)
+
+def read_data_version(database) -> int:
+    with db_session:
+        return get_data_version(database=database)
+
+def read_plan_snapshot(database):
+    """
+    The data version with the plan snapshot it belongs to, read in one transaction.
+    """
+    from app.algorithms.plan import load_plan_snapshot
+
+    with db_session:
+        return (get_data_version(database=database), *load_plan_snapshot(database))
+
+async def get_kept_plan(replan=False) -> KeptPlan:
+    """
+    Return the kept plan, building it first when it is missing or out of date. Its scheduler is
+    None when there are no operations. The snapshot is read on the database threads and the
+    plan built in a worker process, so the event loop keeps serving other requests meanwhile.
+    """
+    from app.algorithms.incremental import IncrementalScheduler
+
+    # The version check and the snapshot read the same replica. Replicas lag each other, so the
+    # snapshot of another one could be older than the version just seen, and the plan would be
+    # rebuilt on every request while they disagree. A replica behind the kept plan leaves it be.
+    database = read_database()
+    version = await run_db(read_data_version, database)
+    async with _plan_build_lock:
+        kept = _kept_plan
+        # A request that waited for another one's rebuild finds the plan up to date
+        if replan or kept is None or kept.version < version:
+            version, operations, machines = await run_db(read_plan_snapshot, database)
+            scheduler = await run_cpu(IncrementalScheduler, operations, machines) if operations else None
+            kept = KeptPlan(scheduler, version, uuid.uuid4().hex[:12])
+            # A confirmation patching the plan holds _plan_lock while it replans, so the swap
+            # waits for it on a thread rather than on the event loop
+            await run_in_threadpool(replace_kept_plan, kept)
+        return kept
+
+def replace_kept_plan(kept: KeptPlan):
+    global _kept_plan
+    with _plan_lock:
+        _kept_plan = kept
+        schedule_cache.clear()
+
+def schedule_etag(plan: KeptPlan, *params) -> str:
+    return '"' + "-".join([plan.token, str(plan.version), *map(str, params)]) + '"'
+
+def window_params(start: Optional[datetime], end: Optional[datetime]) -> list:
+    return [f"{bound}{moment.isoformat()}" for bound, moment in (("from", start), ("to", end)) if moment is not None]
+
+def _naive(moment: Optional[datetime]) -> Optional[datetime]:
+    # Plan times are local and naive
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone().replace(tzinfo=None)
+    return moment
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def schedule_json(scheduler: "IncrementalScheduler", granularity, start, end) -> bytes:
+    window = scheduler.working_window(start, end)
+    return json.dumps(list(scheduler.iter_rows(granularity, window)), default=_json_default).encode()
+
+@router.get(
+    "/scheduled-operations",
+    response_model=Union[List[SchedulingResponse], List[SchedulingBatchResponse], List[SchedulingShiftResponse]]
+)
+async def get_scheduled_operations(
+    granularity: Literal["piece", "batch", "shift"] = "piece",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    replan: bool = False,
+    if_none_match: Optional[str] = Header(None),
     db: Database = Depends(get_database_connection)
 ):
     """
     Endpoint to retrieve scheduling data with part no, operations, machines, start time, end time, and launched quantity.
+
+    With granularity=batch one interval is returned per jump-quantity batch instead of one row per piece,
+    and with granularity=shift one bar per operation, machine and shift. start and end limit the rows
+    to those overlapping that time window, so a zoomed-out chart can ask for few, coarse bars. The last plan is kept between calls; replan=true plans again from now. Responses carry an ETag
+    and a matching If-None-Match gets 304 Not Modified until the schedule data changes.
     """
     try:
-        with db_session:
-            # Fetch operations with machine names through WorkCenterMachine
-            operations = select(op for op in Operation)
-            if not operations:
-                raise HTTPException(status_code=404, detail="No operations found")
-
-            scheduled_operations = []
-            last_end_time = datetime.now()  # Track the end time of the last scheduled operation
-
-            for op in operations:
-                part_number = op.order.part_number if op.order else "N/A"
-                
-                # Fetch machine name via WorkCenter -> WorkCenterMachine
-                machine_name = "N/A"
-                if op.work_center:
-                    machine = select(wcm for wcm in WorkCenterMachine if wcm.work_center == op.work_center).first()
-                    if machine:
-                        machine_name = machine.machine_name
-                
-                # Initialize current_start_time based on the last machine's end time
-                current_start_time = last_end_time
-
-                for quantity in range(1, op.total_quantity + 1):
-                    # Calculate the start time and end time for each quantity sequentially
-                    start_time = current_start_time
-                    end_time = start_time + timedelta(minutes=op.per_piece_time)
-
-                    # Append the scheduled operation with updated times and quantity
-                    scheduled_operations.append({
-                        "part_number": part_number,
-                        "operation_id": op.operation_id,
-                        "operation_description": op.operation_description,
-                        "machine": machine_name,
-                        "start_time": start_time,
-                        "end_time": end_time,
-                        "launched_quantity": quantity  # Each quantity gets a sequential number
-                    })
-                    
-                    # Update the start time for the next quantity
-                    current_start_time = end_time  # Start time for the next quantity is the end time of the current one
-
-                # After finishing the current machine, update the last_end_time to the end of the last quantity
-                last_end_time = current_start_time  # Set the end time of the last quantity as the start time for the next machine
-
-            return scheduled_operations
+        plan = await get_kept_plan(replan)
+        if plan.scheduler is None:
+            raise HTTPException(status_code=404, detail="No operations found")
+
+        etag = schedule_etag(plan, granularity, *window_params(start, end))
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        body = schedule_cache.get(etag)
+        if body is None:
+            body = await run_in_threadpool(schedule_json, plan.scheduler, granularity, _naive(start), _naive(end))
+            # Windows follow the chart's zoom and are rarely asked for twice, so only whole
+            # schedules are kept
+            if start is None and end is None:
+                schedule_cache.put(etag, body)
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching scheduling data: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+@router.get("/scheduled-operations/stream")
+async def stream_scheduled_operations(
+    granularity: Literal["piece", "batch", "shift"] = "piece",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    replan: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db: Database = Depends(get_database_connection)
+):
+    """
+    Stream the same rows as /scheduled-operations as NDJSON, one JSON object per line,
+    as each operation's rows are laid out. Supports ETag / If-None-Match like /scheduled-operations.
+    """
+    try:
+        plan = await get_kept_plan(replan)
+    except Exception as e:
+        logger.error(f"Error fetching scheduling data: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+    if plan.scheduler is None:
+        raise HTTPException(status_code=404, detail="No operations found")
+
+    etag = schedule_etag(plan, granularity, *window_params(start, end), "ndjson")
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # Runs on a thread of the threadpool, like the window conversion
+    def generate():
+        window = plan.scheduler.working_window(_naive(start), _naive(end))
+        for row in plan.scheduler.iter_rows(granularity, window):
+            yield json.dumps(row, default=_json_default) + "\n"
 
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers={"ETag": etag})
+
+def iter_window_columns(scheduler: "IncrementalScheduler", granularity, start, end):
+    """
+    scheduler.iter_columns between two timestamps. The window is converted on first iteration,
+    on the thread that consumes the blocks rather than on the event loop.
+    """
+    yield from scheduler.iter_columns(granularity, scheduler.working_window(start, end))
+
+@router.get("/scheduled-operations/export")
+async def export_scheduled_operations(
+    format: Literal["csv", "xlsx", "parquet"] = "csv",
+    granularity: Literal["piece", "batch", "shift"] = "piece",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    replan: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db: Database = Depends(get_database_connection)
+):
+    """
+    Download the whole schedule as CSV (streamed row by row), xlsx (write-only workbook) or
+    Parquet (needs pyarrow). Rows are produced one operation at a time as column arrays.
+    """
+    try:
+        plan = await get_kept_plan(replan)
     except Exception as e:
         logger.error(f"Error fetching scheduling data: {e}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
 
+    if plan.scheduler is None:
+        raise HTTPException(status_code=404, detail="No operations found")
+
+    etag = schedule_etag(plan, granularity, *window_params(start, end), format)
+    headers = {"ETag": etag, "Content-Disposition": f'attachment; filename="schedule.{format}"'}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    from app.exports.schedule import SCHEDULE_COLUMNS, EXPORT_MEDIA_TYPES, iter_csv, xlsx_bytes, parquet_bytes
+
+    columns = SCHEDULE_COLUMNS[granularity]
+    blocks = iter_window_columns(plan.scheduler, granularity, _naive(start), _naive(end))
+    if format == "csv":
+        return StreamingResponse(iter_csv(blocks, columns), media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+    try:
+        content = await run_in_threadpool(xlsx_bytes if format == "xlsx" else parquet_bytes, blocks, columns)
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=f"{format} export is not available: {e}")
+    except Exception as e:
+        logger.error(f"Error exporting schedule: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+    return Response(content, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+class OperationConfirmation(BaseModel):
+    actual_time: Optional[float] = Field(None, gt=0)  # Minutes for the whole quantity
+    confirmation_number: Optional[str] = Field(None, pattern=r"\S")  # Not empty or blank
+
+def save_confirmation(operation_id: int, confirmation: OperationConfirmation):
+    """
+    Write a confirmation and return the updated operation as planned, with the new data version.
+    """
+    from app.algorithms.plan import to_plan_operation
+
+    with db_session:
+        operation = Operation.get(operation_id=operation_id)
+        if operation is None:
+            raise HTTPException(status_code=404, detail=f"Operation {operation_id} not found")
+        if confirmation.actual_time is not None:
+            operation.actual_time = confirmation.actual_time
+        if confirmation.confirmation_number is not None:
+            operation.confirmation_number = confirmation.confirmation_number
+        return to_plan_operation(operation), bump_data_version()
+
+def patch_kept_plan(plan_operation, version) -> list:
+    """
+    Move the changed operation in the kept plan and return the ids of the operations rescheduled.
+    """
+    global _kept_plan
+    with _plan_lock:
+        # The kept plan can only be patched when this is the one write it has not seen;
+        # otherwise the next request rebuilds it for the new version
+        if _kept_plan is not None and _kept_plan.scheduler is not None and _kept_plan.version == version - 1:
+            try:
+                rescheduled = _kept_plan.scheduler.update_operation(plan_operation)
+                _kept_plan = _kept_plan._replace(version=version)
+                schedule_cache.clear()
+                return rescheduled
+            except KeyError:
+                _kept_plan = None
+                schedule_cache.clear()
+    return []
+
+@router.post("/operations/{operation_id}/confirmation")
+async def confirm_operation(
+    operation_id: int,
+    confirmation: OperationConfirmation,
+    db: Database = Depends(get_database_connection)
+):
+    """
+    Record a shop-floor confirmation on an operation and move only the part of the kept plan it affects.
+    """
+    try:
+        plan_operation, version = await run_db(save_confirmation, operation_id, confirmation)
+        rescheduled = await run_in_threadpool(patch_kept_plan, plan_operation, version)
+        return {"status": "success", "operation_id": operation_id, "rescheduled_operations": rescheduled}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error confirming operation: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+class MachineUtilizationResponse(BaseModel):
+    machine: str  # Machine name
+    work_center_code: str
+    busy_minutes: float
+    utilization: float
+
+def read_work_center_codes() -> dict:
+    with db_session:
+        return dict(select((wc.work_center_id, wc.work_center_code) for wc in read_database().WorkCenter))
+
+def utilization_json(scheduler: "IncrementalScheduler", work_center_codes: dict) -> bytes:
+    from app.algorithms.shift_calendar import MICROSECONDS_PER_MINUTE
+
+    return json.dumps([
+        {
+            "machine": usage["machine"],
+            "work_center_code": work_center_codes.get(usage["work_center"], "N/A"),
+            "busy_minutes": usage["busy_time"] / MICROSECONDS_PER_MINUTE,
+            "utilization": usage["utilization"]
+        } for usage in scheduler.utilization().values()
+    ]).encode()
+
+@router.get("/machine-utilization", response_model=List[MachineUtilizationResponse])
+async def get_machine_utilization(
+    replan: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db: Database = Depends(get_database_connection)
+):
+    """
+    Busy time and utilization of every machine over the kept plan that /scheduled-operations
+    serves, from its start to the end of the last batch. Cached and tagged with an ETag per plan
+    version like /scheduled-operations.
+    """
+    try:
+        plan = await get_kept_plan(replan)
+        if plan.scheduler is None:
+            return []
 
+        etag = schedule_etag(plan, "utilization")
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        body = schedule_cache.get(etag)
+        if body is None:
+            work_center_codes = await run_db(read_work_center_codes)
+            body = await run_in_threadpool(utilization_json, plan.scheduler, work_center_codes)
+            schedule_cache.put(etag, body)
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    except Exception as e:
+        logger.error(f"Error computing machine utilization: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+
+
+# Longest a what-if schedule may run, in seconds; requests can ask for less
+SCHEDULE_TIME_LIMIT = float(os.getenv("SCHEDULE_TIME_LIMIT", "10"))
+
+class ScheduleRequest(BaseModel):
+    component_quantities: Dict[str, int]  # Units to schedule per component (work center code)
+    start: Optional[datetime] = None  # Default now
+    horizon_end: Optional[datetime] = None  # No round of units starts after it
+    time_limit: Optional[float] = Field(None, gt=0)  # Seconds, at most SCHEDULE_TIME_LIMIT
+    max_intervals: int = Field(10000, ge=0, le=1000000)  # Intervals returned; the count covers all
+
+class ScheduleMachineResponse(BaseModel):
+    machine: str  # Machine name
+    work_center: str
+    end_time: datetime
+    busy_minutes: float
+    utilization: float
+
+class ScheduleIntervalResponse(BaseModel):
+    component: str
+    operation_id: int
+    machine: str  # Machine name
+    start_time: datetime
+    end_time: datetime
+
+class ScheduleResponse(BaseModel):
+    status: str
+    start_time: datetime
+    completion_time: datetime
+    makespan_minutes: float
+    truncated: bool  # The horizon or time limit was reached; see remaining_quantities
+    remaining_quantities: Dict[str, int]
+    machines: List[ScheduleMachineResponse]
+    total_intervals: int
+    intervals: List[ScheduleIntervalResponse]
+
+# Snapshot of the operations and machines the what-if schedules run on, with its data version
+_scheduling_snapshot = None
+
+def read_scheduling_snapshot():
+    """
+    The kept scheduling snapshot, loaded again once the data version has moved on.
+    """
+    global _scheduling_snapshot
+    from app.algorithms.scheduling import load_scheduling_snapshot
+
+    database = read_database()
+    with db_session:
+        version = get_data_version(database=database)
+        kept = _scheduling_snapshot
+        if kept is None or kept[0] < version:
+            kept = _scheduling_snapshot = (version, *load_scheduling_snapshot(database))
+    return kept
+
+def check_component_quantities(component_quantities: dict, operations):
+    """
+    Reject negative quantities and components without operations in the snapshot.
+    """
+    negative = [component for component, quantity in component_quantities.items() if quantity < 0]
+    if negative:
+        raise HTTPException(status_code=400, detail=f"Negative quantities for: {', '.join(negative)}")
+    unknown = sorted(set(component_quantities) - set(operations["work_center"]))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"No operations for components: {', '.join(unknown)}")
+
+def schedule_response(schedule, max_intervals: int) -> dict:
+    intervals = schedule.intervals
+    shown = intervals.head(max_intervals)
+    return {
+        "status": "success",
+        "start_time": schedule.start_time,
+        "completion_time": schedule.completion_time,
+        "makespan_minutes": (schedule.completion_time - schedule.start_time).total_seconds() / 60,
+        "truncated": schedule.truncated,
+        "remaining_quantities": schedule.remaining_quantities,
+        "machines": [
+            {key: machine[key] for key in ("machine", "work_center", "end_time", "busy_minutes", "utilization")}
+            for machine in schedule.machines if machine["end_time"] is not None
+        ],
+        "total_intervals": len(intervals),
+        "intervals": [
+            dict(zip(shown.columns, row))
+            for row in zip(*[shown[column].tolist() for column in shown.columns])
+        ],
+    }
+
+@router.post("/schedule", response_model=ScheduleResponse)
+async def create_schedule(
+    request: ScheduleRequest,
+    db: Database = Depends(get_database_connection)
+):
+    """
+    Schedule the requested units of each component on the current operations and machines, for
+    trying what-if quantities. Returns the makespan, the end time of every machine used and the
+    piece intervals. The run stops at horizon_end and after time_limit seconds (at most
+    SCHEDULE_TIME_LIMIT), reporting the units left out.
+    """
+    from app.algorithms.scheduling import schedule_components
+
+    try:
+        _, operations, machines = await run_db(read_scheduling_snapshot)
+        if operations.empty:
+            raise HTTPException(status_code=404, detail="No operations found")
+        check_component_quantities(request.component_quantities, operations)
+
+        schedule = await run_cpu(
+            schedule_components,
+            operations,
+            machines,
+            request.component_quantities,
+            _naive(request.start),
+            _naive(request.horizon_end),
+            min(request.time_limit or SCHEDULE_TIME_LIMIT, SCHEDULE_TIME_LIMIT)
+        )
+        return await run_in_threadpool(schedule_response, schedule, request.max_intervals)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error scheduling components: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
+# Most scenarios one comparison may run
+SCENARIO_LIMIT = int(os.getenv("SCENARIO_LIMIT", "200"))
+
+class ScenarioRequest(BaseModel):
+    scenarios: Dict[str, Dict[str, int]]  # Scenario name to its component quantities
+    start: Optional[datetime] = None  # Default now, the same for every scenario
+    horizon_end: Optional[datetime] = None
+    time_limit: Optional[float] = Field(None, gt=0)  # Seconds per scenario, at most SCHEDULE_TIME_LIMIT
+
+class ScenarioResult(BaseModel):
+    scenario: str
+    start_time: datetime
+    completion_time: datetime
+    makespan_minutes: float
+    truncated: bool
+    remaining_quantities: Dict[str, int]
+    work_center_utilization: Dict[str, float]  # Mean machine utilization per work center code
+    order_completion: Dict[int, datetime]  # Last piece end per order id
+    run_seconds: float
+
+class ScenarioComparisonResponse(BaseModel):
+    status: str
+    work_centers: List[str]
+    orders: List[int]
+    scenarios: List[ScenarioResult]
+
+@router.post("/schedule/scenarios", response_model=ScenarioComparisonResponse)
+async def compare_schedule_scenarios(
+    request: ScenarioRequest,
+    db: Database = Depends(get_database_connection)
+):
+    """
+    Schedule many what-if component quantity vectors against the same snapshot, in parallel on
+    the planning workers, and compare their makespan, work center utilization and order completion.
+    work_centers and orders list the keys that appear in any scenario, as columns for a table.
+    """
+    from app.algorithms.scenarios import run_scenarios
+
+    if not request.scenarios:
+        raise HTTPException(status_code=400, detail="No scenarios given")
+    if len(request.scenarios) > SCENARIO_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {SCENARIO_LIMIT} scenarios per request")
+
+    try:
+        version, operations, machines = await run_db(read_scheduling_snapshot)
+        if operations.empty:
+            raise HTTPException(status_code=404, detail="No operations found")
+        for component_quantities in request.scenarios.values():
+            check_component_quantities(component_quantities, operations)
+
+        results = await run_scenarios(
+            version,
+            operations,
+            machines,
+            list(request.scenarios.items()),
+            _naive(request.start),
+            _naive(request.horizon_end),
+            min(request.time_limit or SCHEDULE_TIME_LIMIT, SCHEDULE_TIME_LIMIT)
+        )
+        return {
+            "status": "success",
+            "work_centers": sorted({work_center for result in results for work_center in result["work_center_utilization"]}),
+            "orders": sorted({order_id for result in results for order_id in result["order_completion"]}),
+            "scenarios": results,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error comparing schedule scenarios: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
 
 class DetailedDatabaseResponse(BaseModel):
     status: str
     total_records: Dict[str, int]
-    master_orders: List[Dict]
-    document_references: List[Dict]
-    raw_materials: List[Dict]
-    work_centers: List[Dict]
-    work_center_machines: List[Dict]
-    operations: List[Dict]
-    delivery_schedules: List[Dict]
+    master_orders: Optional[List[Dict]] = None
+    document_references: Optional[List[Dict]] = None
+    raw_materials: Optional[List[Dict]] = None
+    work_centers: Optional[List[Dict]] = None
+    work_center_machines: Optional[List[Dict]] = None
+    operations: Optional[List[Dict]] = None
+    delivery_schedules: Optional[List[Dict]] = None
     production_insights: Dict
+    next_cursors: Dict[str, Optional[int]] = {}
 
 def get_database_connection():
     """
@@ -122,154 +644,271 @@ def get_database_connection():
         logger.error(f"Database connection error: {e}")
         raise HTTPException(status_code=500, detail=f"Database connection failed: {e}")
 
-@router.get("/comprehensive-database-insights", response_model=DetailedDatabaseResponse)
-def get_comprehensive_database_insights(
+# Tables served by the insights endpoint: entity and columns, as row key -> attribute path from
+# the entity, the primary key first. Child rows read foreign keys through the parent primary key,
+# which needs no join.
+INSIGHT_TABLES = {
+    "master_orders": (MasterOrder, {
+        "order_id": "order_id",
+        "project_name": "project_name",
+        "part_number": "part_number",
+        "wbs": "wbs",
+        "sale_order": "sale_order",
+        "part_description": "part_description",
+        "total_operations": "total_operations",
+        "plant": "plant",
+        "routing_sequence_no": "routing_sequence_no",
+        "required_quantity": "required_quantity",
+        "launched_quantity": "launched_quantity",
+        "production_order_no": "production_order_no",
+    }),
+    "document_references": (DocumentReference, {
+        "document_reference_id": "document_reference_id",
+        "order_id": "order.order_id",
+        "document_type": "document_type",
+        "document_number": "document_number",
+        "revision": "revision"
+    }),
+    "raw_materials": (RawMaterial, {
+        "raw_material_id": "raw_material_id",
+        "order_id": "order.order_id",
+        "child_part_no": "child_part_no",
+        "description": "description",
+        "qty_per_set": "qty_per_set",
+        "total_qty": "total_qty",
+        "is_available": "is_available"
+    }),
+    "work_centers": (WorkCenter, {
+        "work_center_id": "work_center_id",
+        "work_center_code": "work_center_code",
+        "description": "description"
+    }),
+    "work_center_machines": (WorkCenterMachine, {
+        "machine_id": "machine_id",
+        "work_center_code": "work_center.work_center_code",
+        "machine_name": "machine_name",
+        "status": "status"
+    }),
+    "operations": (Operation, {
+        "operation_id": "operation_id",
+        "order_id": "order.order_id",
+        "work_center_code": "work_center.work_center_code",
+        "operation_number": "operation_number",
+        "operation_description": "operation_description",
+        "setup_time": "setup_time",
+        "per_piece_time": "per_piece_time",
+        "total_quantity": "total_quantity"
+    }),
+    "delivery_schedules": (DeliverySchedule, {
+        "delivery_schedule_id": "delivery_schedule_id",
+        "order_id": "order.order_id",
+        "scheduled_delivery_date": "scheduled_delivery_date",
+        "delivery_status": "delivery_status"
+    }),
+}
+
+def count_table_records(database=None):
+    """
+    Count the rows of every insights table with COUNT queries, on database when one is given.
+    """
+    return {
+        table: (database.entities[entity.__name__] if database else entity).select().count()
+        for table, (entity, _) in INSIGHT_TABLES.items()
+    }
+
+def _split_param(value):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+def parse_insight_cursors(after):
+    """
+    Parse an after cursor of the form "operations:120,raw_materials:45" into {table: last_id}.
+    """
+    cursors = {}
+    for item in _split_param(after):
+        table, _, last_id = item.partition(":")
+        if table not in INSIGHT_TABLES or not last_id.isdigit():
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {item}")
+        cursors[table] = int(last_id)
+    return cursors
+
+def parse_insight_fields(fields, tables):
+    """
+    Parse fields=... into {table: set of columns}. Unqualified fields apply to every table,
+    "table.field" only to that table. Tables without requested fields return all columns.
+    Raises a 400 for an unknown table, or a field that is not a column of its table or, when
+    unqualified, of any of the tables.
+    """
+    projections = {}
+    for item in _split_param(fields):
+        table, _, field = item.rpartition(".")
+        names = [table] if table else tables
+        for name in names:
+            if name not in INSIGHT_TABLES:
+                raise HTTPException(status_code=400, detail=f"Unknown table in fields: {name}")
+        if not any(field in INSIGHT_TABLES[name][1] for name in names):
+            raise HTTPException(status_code=400, detail=f"Unknown field: {item}")
+        for name in names:
+            projections.setdefault(name, set()).add(field)
+    return projections
+
+def fetch_insight_page(table, after=None, limit=None, fields=None, database=None):
+    """
+    Fetch one keyset page of a table ordered by primary key, on database when one is given.
+    Only the requested fields and the primary key are selected. Returns the rows and the cursor
+    of the next page, or None when the table is exhausted.
+    """
+    entity, columns = INSIGHT_TABLES[table]
+    if database is not None:
+        entity = database.entities[entity.__name__]
+    pk = entity._pk_.name
+    names = [name for name in columns if not fields or name in fields or name == pk]
+
+    # A tuple of the selected attribute paths, the primary key first so it orders the page
+    query_text = "(%s) for row in entity" % "".join(f"row.{columns[name]}, " for name in names)
+    if after is not None:
+        query_text += f" if row.{pk} > after"
+    query = select(query_text, {}, {"entity": entity, "after": after}).without_distinct().order_by(1)
+
+    records = query.limit(limit + 1)[:] if limit else query[:]
+    if len(names) == 1:
+        records = [(record,) for record in records]  # Pony selects a one-column tuple as its value
+    next_cursor = None
+    if limit and len(records) > limit:
+        records = records[:limit]
+        next_cursor = records[-1][0]
+    return [dict(zip(names, record)) for record in records], next_cursor
+
+def read_database_insights(selected_tables, cursors, limit, projections) -> dict:
+    database = read_database()
+    with db_session:
+        try:
+            total_records = count_table_records(database)
+
+            response = {"status": "success", "total_records": total_records, "next_cursors": {}}
+            for table in selected_tables:
+                rows, next_cursor = fetch_insight_page(
+                    table, cursors.get(table), limit, projections.get(table), database
+                )
+                response[table] = rows
+                response["next_cursors"][table] = next_cursor
+
+            # Production insights
+            response["production_insights"] = {
+                "total_orders": total_records["master_orders"],
+                "total_raw_materials": total_records["raw_materials"],
+                "total_work_centers": total_records["work_centers"],
+                "total_operations": total_records["operations"]
+            }
+            return response
+
+        except Exception as fetch_error:
+            logger.error(f"Error fetching database records: {fetch_error}")
+            logger.error(traceback.format_exc())
+            raise HTTPException(status_code=500, detail=f"Error fetching database records: {fetch_error}")
+
+@router.get(
+    "/comprehensive-database-insights",
+    response_model=DetailedDatabaseResponse,
+    response_model_exclude_none=True
+)
+async def get_comprehensive_database_insights(
+    tables: Optional[str] = Query(None, description="Comma-separated tables to return, default all"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns, optionally as table.column"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Maximum rows per table"),
+    after: Optional[str] = Query(None, description="Per-table keyset cursors, e.g. operations:120"),
     db: Database = Depends(get_database_connection)
 ):
     """
-    Retrieve comprehensive and enriched data from all database tables with additional insights
+    Retrieve comprehensive and enriched data from the database tables with additional insights.
+
+    Each table is paginated by primary key: pass limit, then send the returned next_cursors back
+    as after=table:id for the tables that still have rows. Without limit every row is returned.
     """
+    selected_tables = _split_param(tables) or list(INSIGHT_TABLES)
+    unknown_tables = [table for table in selected_tables if table not in INSIGHT_TABLES]
+    if unknown_tables:
+        raise HTTPException(status_code=400, detail=f"Unknown tables: {', '.join(unknown_tables)}")
+    cursors = parse_insight_cursors(after)
+    projections = parse_insight_fields(fields, selected_tables)
+
     try:
-        with db_session:
-            # Import models
-            from app.database.models import (
-                MasterOrder, 
-                DocumentReference, 
-                RawMaterial, 
-                WorkCenter, 
-                WorkCenterMachine, 
-                Operation, 
-                DeliverySchedule
-            )
-
-            # Fetch all records with error handling and logging
-            try:
-                master_orders = list(select(order for order in MasterOrder))
-                document_references = list(select(doc for doc in DocumentReference))
-                raw_materials = list(select(rm for rm in RawMaterial))
-                work_centers = list(select(wc for wc in WorkCenter))
-                work_center_machines = list(select(wcm for wcm in WorkCenterMachine))
-                operations = list(select(op for op in Operation))
-                delivery_schedules = list(select(ds for ds in DeliverySchedule))
-
-                # Detailed data extraction with comprehensive information
-                detailed_master_orders = [
-                    {
-                        "order_id": order.order_id,
-                        "project_name": order.project_name,
-                        "part_number": order.part_number,
-                        "wbs": order.wbs,
-                        "sale_order": order.sale_order,
-                        "part_description": order.part_description,
-                        "total_operations": order.total_operations,
-                        "plant": order.plant,
-                        "routing_sequence_no": order.routing_sequence_no,
-                        "required_quantity": order.required_quantity,
-                        "launched_quantity": order.launched_quantity,
-                        "production_order_no": order.production_order_no,
-                    } for order in master_orders
-                ]
-
-                detailed_document_references = [
-                    {
-                        "document_reference_id": doc.document_reference_id,
-                        "order_id": doc.order.order_id,
-                        "document_type": doc.document_type,
-                        "document_number": doc.document_number,
-                        "revision": doc.revision
-                    } for doc in document_references
-                ]
-
-                detailed_raw_materials = [
-                    {
-                        "raw_material_id": rm.raw_material_id,
-                        "order_id": rm.order.order_id,
-                        "child_part_no": rm.child_part_no,
-                        "description": rm.description,
-                        "qty_per_set": rm.qty_per_set,
-                        "total_qty": rm.total_qty,
-                        "is_available": rm.is_available
-                    } for rm in raw_materials
-                ]
-
-                detailed_work_centers = [
-                    {
-                        "work_center_id": wc.work_center_id,
-                        "work_center_code": wc.work_center_code,
-                        "description": wc.description
-                    } for wc in work_centers
-                ]
-
-                detailed_work_center_machines = [
-                    {
-                        "machine_id": wcm.machine_id,
-                        "work_center_code": wcm.work_center.work_center_code,
-                        "machine_name": wcm.machine_name,
-                        "status": wcm.status
-                    } for wcm in work_center_machines
-                ]
-
-                detailed_operations = [
-                    {
-                        "operation_id": op.operation_id,
-                        "order_id": op.order.order_id,
-                        "work_center_code": op.work_center.work_center_code,
-                        "operation_number": op.operation_number,
-                        "operation_description": op.operation_description,
-                        "setup_time": op.setup_time,
-                        "per_piece_time": op.per_piece_time,
-                        "total_quantity": op.total_quantity
-                    } for op in operations
-                ]
-
-                detailed_delivery_schedules = [
-                    {
-                        "delivery_schedule_id": ds.delivery_schedule_id,
-                        "order_id": ds.order.order_id,
-                        "scheduled_delivery_date": ds.scheduled_delivery_date,
-                        "delivery_status": ds.delivery_status
-                    } for ds in delivery_schedules
-                ]
-
-                # Production insights
-                production_insights = {
-                    "total_orders": len(master_orders),
-                    "total_raw_materials": len(raw_materials),
-                    "total_work_centers": len(work_centers),
-                    "total_operations": len(operations)
-                }
-
-                return {
-                    "status": "success",
-                    "total_records": {
-                        "master_orders": len(master_orders),
-                        "document_references": len(document_references),
-                        "raw_materials": len(raw_materials),
-                        "work_centers": len(work_centers),
-                        "work_center_machines": len(work_center_machines),
-                        "operations": len(operations),
-                        "delivery_schedules": len(delivery_schedules)
-                    },
-                    "master_orders": detailed_master_orders,
-                    "document_references": detailed_document_references,
-                    "raw_materials": detailed_raw_materials,
-                    "work_centers": detailed_work_centers,
-                    "work_center_machines": detailed_work_center_machines,
-                    "operations": detailed_operations,
-                    "delivery_schedules": detailed_delivery_schedules,
-                    "production_insights": production_insights
-                }
-
-            except Exception as fetch_error:
-                logger.error(f"Error fetching database records: {fetch_error}")
-                logger.error(traceback.format_exc())
-                raise HTTPException(status_code=500, detail=f"Error fetching database records: {fetch_error}")
+        return await run_db(read_database_insights, selected_tables, cursors, limit, projections)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Comprehensive database insights error: {e}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
 
+class InsightsSummaryResponse(BaseModel):
+    status: str
+    total_records: Dict[str, int]
+    allowed_time_by_work_center: Dict[str, float]
+    raw_material_availability: Dict[str, Union[int, float]]
+    deliveries: Dict[str, int]
+
+def read_insights_summary() -> dict:
+    database = read_database()
+    with db_session:
+        today = date.today()
+
+        allowed_time_by_work_center = dict(select(
+            (op.work_center.work_center_code, sum(op.allowed_time)) for op in database.Operation
+        ))
+
+        total_raw_materials = count(rm for rm in database.RawMaterial)
+        available_raw_materials = count(rm for rm in database.RawMaterial if rm.is_available)
+
+        on_time = count(
+            ds for ds in database.DeliverySchedule
+            if ds.actual_delivery_date is not None and ds.actual_delivery_date <= ds.scheduled_delivery_date
+        )
+        late = count(
+            ds for ds in database.DeliverySchedule
+            if ds.actual_delivery_date is not None and ds.actual_delivery_date > ds.scheduled_delivery_date
+        )
+        overdue = count(
+            ds for ds in database.DeliverySchedule
+            if ds.actual_delivery_date is None and ds.scheduled_delivery_date < today
+        )
+        pending = count(
+            ds for ds in database.DeliverySchedule
+            if ds.actual_delivery_date is None and ds.scheduled_delivery_date >= today
+        )
+
+        return {
+            "status": "success",
+            "total_records": count_table_records(database),
+            "allowed_time_by_work_center": allowed_time_by_work_center,
+            "raw_material_availability": {
+                "available": available_raw_materials,
+                "total": total_raw_materials,
+                "ratio": available_raw_materials / total_raw_materials if total_raw_materials else 0.0
+            },
+            "deliveries": {
+                "on_time": on_time,
+                "late": late + overdue,  # Undelivered past the scheduled date counts as late
+                "overdue": overdue,
+                "pending": pending
+            }
+        }
+
+@router.get("/insights/summary", response_model=InsightsSummaryResponse)
+async def get_insights_summary(
+    db: Database = Depends(get_database_connection)
+):
+    """
+    Lightweight counts and aggregates computed in the database, suitable for frequent polling
+    """
+    try:
+        return await run_db(read_insights_summary)
+
+    except Exception as e:
+        logger.error(f"Insights summary error: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {e}")
+
 # Logging configuration for detailed error tracking
 logging.basicConfig(
     level=logging.INFO,
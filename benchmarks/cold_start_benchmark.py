@@ -0,0 +1,63 @@
+"""
+Benchmark the cold start of an API worker, each run in a fresh interpreter: importing app.main,
+the lifespan startup (database binding and mapping) and the imports deferred to the first
+scheduling request.
+
+    python -m benchmarks.cold_start_benchmark --runs 10
+    python -m benchmarks.cold_start_benchmark --runs 10 --no-database
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in the child interpreter and prints the phase timings, in seconds, as JSON
+WORKER = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+from app.main import app
+timings = {"import": time.perf_counter() - started}
+
+if sys.argv[1] == "database":
+    async def start():
+        started = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            timings["startup"] = time.perf_counter() - started
+    asyncio.run(start())
+
+started = time.perf_counter()
+import app.algorithms.incremental, app.algorithms.plan, app.exports.schedule
+timings["first_schedule_imports"] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+def measure_worker(database=True) -> dict:
+    """
+    Phase timings of one cold start, in seconds.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-c", WORKER, "database" if database else "none"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-database", action="store_true", help="Skip the lifespan startup, which needs the database")
+    args = parser.parse_args(argv)
+
+    runs = [measure_worker(not args.no_database) for _ in range(args.runs)]
+    print(f"{'phase':<24}{'min ms':>10}{'median ms':>12}{'max ms':>10}")
+    for phase in runs[0]:
+        values = [run[phase] * 1000 for run in runs]
+        print(f"{phase:<24}{min(values):>10.1f}{statistics.median(values):>12.1f}{max(values):>10.1f}")
+    totals = [sum(run.values()) * 1000 for run in runs]
+    print(f"{'total':<24}{min(totals):>10.1f}{statistics.median(totals):>12.1f}{max(totals):>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the OARC text parser on a corpus of synthetic OARC documents.
+
+    python -m benchmarks.oarc_parser_benchmark --documents 500 --operations 200
+"""
+import argparse
+import random
+import time
+from app.ingestion.oarc_parser import parse_oarc_text
+
+WORK_CENTERS = ["CNC-01", "CNC-02", "LATHE-1", "MILL-3", "GRIND-2", "INSP-01"]
+DESCRIPTIONS = ["Turning", "Milling", "Drilling", "Grinding", "Deburring", "Inspection"]
+
+def synthetic_oarc_text(index: int, operations: int, rng: random.Random) -> str:
+    """
+    Text of one OARC document, laid out as PyPDF2 extracts it: header fields, the operations
+    table with long texts (the first operation being document verification), the raw materials
+    table and a page break every 40 operations.
+    """
+    lines = [
+        f"Project Name : PROJECT {index} Part No : PN-{index:05d} WBS : WBS-{index}",
+        f"Sale order : SO-{index} Part Desc : HOUSING ASSY {index} Type : M",
+        f"Plant : 1000 Rtg Seq No : {rng.randint(1, 9)} Sequence No : 0",
+        f"Required Qty : {rng.randint(1, 500)} Launched Qty : {rng.randint(1, 500)} Prod Order No : {100000 + index}",
+        "_" * 80,
+        "Oprn Wc/Plant Setup Per Pc Jmp Tot Allowed Confirm Operation",
+    ]
+    for number in range(1, operations + 1):
+        lines.append(
+            f"{number * 10:04d} {rng.choice(WORK_CENTERS)} {rng.uniform(0, 60):.1f} {rng.uniform(0.1, 30):.2f} "
+            f"{rng.randint(1, 20)} {rng.randint(20, 500)} {rng.uniform(10, 900):.1f} {rng.randint(1000, 9999)}"
+        )
+        if number == 1:
+            lines += [
+                "1000 Document Verification",
+                "Long Text:",
+                "OARC Rev. : 03",
+                "Drawing No. : DRG-1234 Rev. : B",
+                "Raw Material Index Doc No. : RMI-77 Rev. : 2",
+            ]
+        else:
+            lines += ["1000", rng.choice(DESCRIPTIONS), "Long Text:"]
+            lines += [f"Check dimension {k} per drawing" for k in range(rng.randint(0, 3))]
+        if number % 40 == 0:
+            lines += ["", "_" * 80, "Oprn Wc/Plant Setup Per Pc Jmp Tot Allowed Confirm Operation"]
+    lines.append("Item Child Part No Description Qty Per Set UoM Total Qty")
+    for number in range(1, rng.randint(2, 12)):
+        lines.append(f"{number:04d} RM{index}X{number} STEEL BAR EN8 {rng.uniform(0.1, 5):.2f} KG {rng.uniform(1, 500):.2f}")
+    lines += ["SPECIAL NOTE : Handle with care", ""]
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--operations", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    corpus = [synthetic_oarc_text(index, args.operations, rng) for index in range(args.documents)]
+    size = sum(len(text) for text in corpus)
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            parse_oarc_text(text)
+        best = min(best, time.perf_counter() - started)
+
+    print(f"{args.documents} documents x {args.operations} operations ({size / 1e6:.1f} MB of text)")
+    print(f"best of {args.repeat}: {best:.3f}s, {best / args.documents * 1000:.2f} ms/document, {size / best / 1e6:.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
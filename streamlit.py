@@ -4,26 +4,99 @@ import plotly.express as px
 import requests
 from datetime import datetime
 
-# Function to fetch scheduling data from the API endpoint
-def fetch_scheduled_operations():
-    url = "http://localhost:4567/api/scheduled-operations"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        st.error(f"Error fetching data: {response.status_code}")
-        return []
+API_URL = "http://localhost:4567/api"
+
+# Most bars the chart is asked to draw; coarser levels of detail are used beyond it
+MAX_BARS = 3000
+
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (3.05, 120)
+
+# Parsed schedules are kept per ETag; the TTL only bounds how long unused ones stay in memory
+SCHEDULE_CACHE_TTL = 600
+
+SCHEDULE_DTYPES = {
+    "part_number": "category",
+    "operation_id": "int64",
+    "operation_description": "category",
+    "machine": "category",
+    "launched_quantity": "int64",
+    "quantity_start": "int64",
+    "quantity_end": "int64",
+    "batches": "int64",
+}
+
+# One pooled HTTP session per Streamlit server process, reused across reruns and users
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# Current ETag of a schedule view, or None when there is nothing to show. If-None-Match: *
+# matches any version, so the server answers 304 with just the ETag.
+def fetch_schedule_etag(params):
+    response = get_session().get(
+        f"{API_URL}/scheduled-operations",
+        params=params,
+        headers={"If-None-Match": "*"},
+        timeout=REQUEST_TIMEOUT
+    )
+    if response.status_code == 404:
+        return None
+    if response.status_code not in (200, 304):
+        response.raise_for_status()
+    return response.headers.get("ETag")
+
+# Download and parse one version of a schedule view; reruns with the same ETag reuse the result
+@st.cache_data(ttl=SCHEDULE_CACHE_TTL, max_entries=32, show_spinner="Loading schedule...")
+def load_schedule(params, etag):
+    response = get_session().get(f"{API_URL}/scheduled-operations", params=dict(params), timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return create_gantt_df(response.json())
 
-# Convert list of scheduled operations into a DataFrame
+# Function to fetch scheduling data; only downloads when the schedule version changed
+def fetch_scheduled_operations(**params):
+    params = tuple(sorted(params.items()))
+    try:
+        etag = fetch_schedule_etag(params)
+        if etag is None:
+            return pd.DataFrame()
+        return load_schedule(params, etag)
+    except requests.RequestException as e:
+        st.error(f"Error fetching data: {e}")
+        return pd.DataFrame()
+
+# Convert list of scheduled operations into a typed DataFrame
 def create_gantt_df(scheduled_operations):
     df = pd.DataFrame(scheduled_operations)
+    if df.empty:
+        return df
     # Convert datetime columns to appropriate formats
-    df['start_time'] = pd.to_datetime(df['start_time'])
-    df['end_time'] = pd.to_datetime(df['end_time'])
-    return df
+    df['start_time'] = pd.to_datetime(df['start_time'], format="ISO8601")
+    df['end_time'] = pd.to_datetime(df['end_time'], format="ISO8601")
+    return df.astype({column: dtype for column, dtype in SCHEDULE_DTYPES.items() if column in df})
+
+# Pick the finest level of detail that keeps the window under MAX_BARS, estimated from the shift overview
+def choose_granularity(overview, start, end):
+    visible = overview[(overview['end_time'] > start) & (overview['start_time'] < end)]
+    # A shift row's quantity range bounds the pieces it covers
+    if (visible['quantity_end'] - visible['quantity_start'] + 1).sum() <= MAX_BARS:
+        return "piece"
+    if visible['batches'].sum() <= MAX_BARS:
+        return "batch"
+    return "shift"
 
 # Function to display Gantt chart using Plotly
-def plot_gantt_chart(df):
+def plot_gantt_chart(df, granularity="piece"):
+    if granularity == "piece":
+        hover_data = ["operation_id", "start_time", "end_time", "launched_quantity"]
+    else:
+        hover_data = ["operation_id", "start_time", "end_time", "quantity_start", "quantity_end"]
+        if granularity == "shift":
+            hover_data.append("batches")
     fig = px.timeline(df,
                        x_start="start_time",
                        x_end="end_time",
@@ -32,7 +105,7 @@ def plot_gantt_chart(df):
                        title="Scheduled Operations Machine-Wise",
                        labels={"machine": "Machine", "part_number": "Part Number"},
                        hover_name="operation_description",
-                       hover_data=["operation_id", "start_time", "end_time", "launched_quantity"])
+                       hover_data=hover_data)
     fig.update_yaxes(categoryorder="total ascending")  # Sort machines
     fig.update_layout(xaxis_title="Time", yaxis_title="Machine")
     st.plotly_chart(fig)
@@ -40,21 +113,38 @@ def plot_gantt_chart(df):
 # Main function to display Streamlit app
 def main():
     st.title("Scheduled Operations - Gantt Chart Machine-Wise")
-    
-    # Fetch the scheduled operations from the API
-    scheduled_operations = fetch_scheduled_operations()
-    
-    if scheduled_operations:
-        # Create a DataFrame from the fetched data
-        df = create_gantt_df(scheduled_operations)
-        
+
+    # One bar per operation, machine and shift gives the span of the plan at any size
+    overview = fetch_scheduled_operations(granularity="shift")
+
+    if not overview.empty:
+        # Zooming in on a window brings in finer detail
+        plan_start = overview['start_time'].min().to_pydatetime()
+        plan_end = overview['end_time'].max().to_pydatetime()
+        start, end = st.sidebar.slider(
+            "Time window",
+            min_value=plan_start,
+            max_value=plan_end,
+            value=(plan_start, plan_end),
+            format="YYYY-MM-DD HH:mm"
+        )
+        granularity = choose_granularity(overview, start, end)
+        if granularity == "shift" and (start, end) == (plan_start, plan_end):
+            df = overview
+        else:
+            df = fetch_scheduled_operations(granularity=granularity, start=start.isoformat(), end=end.isoformat())
+            if df.empty:
+                st.warning("No scheduled operations in this time window.")
+                return
+        st.sidebar.caption(f"{len(df)} bars, one per {granularity}")
+
         # Display the raw data in a table
         st.subheader("Scheduled Operations Data")
         st.dataframe(df)
-        
+
         # Display the Gantt chart
         st.subheader("Machine-Wise Gantt Chart")
-        plot_gantt_chart(df)
+        plot_gantt_chart(df, granularity)
     else:
         st.warning("No scheduled operations found.")
 
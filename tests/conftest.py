@@ -0,0 +1,45 @@
+import pytest
+from pony.orm import Database, db_session
+from app.database.models import define_entities
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    A database of the entities on a fresh SQLite file, with its tables created.
+    """
+    database = define_entities(Database())
+    database.bind(provider="sqlite", filename=str(tmp_path / "test.sqlite"), create_db=True)
+    database.generate_mapping(create_tables=True)
+    yield database
+    database.disconnect()
+
+@pytest.fixture
+def seed_plan():
+    """
+    Function that adds orders to a database, each with its operations spread over the work
+    centers. The work centers and their machines are created by the first call.
+    """
+    def seed(database, orders, operations_per_order=3, work_centers=3, machines_per_work_center=2, quantity=5):
+        with db_session:
+            centers = list(database.WorkCenter.select().order_by(database.WorkCenter.work_center_id))
+            for number in range(0 if centers else work_centers):
+                work_center = database.WorkCenter(work_center_code=f"WC{number}", description=f"Work center {number}")
+                for machine in range(machines_per_work_center):
+                    database.WorkCenterMachine(work_center=work_center, machine_name=f"M{number}-{machine}", status="Active")
+                centers.append(work_center)
+            first = database.MasterOrder.select().count()
+            for number in range(first, first + orders):
+                order = database.MasterOrder(
+                    project_name="Project", part_number=f"P{number}", wbs="WBS", sale_order="SO",
+                    part_description="Part", total_operations=operations_per_order, plant="Plant",
+                    routing_sequence_no=1, required_quantity=quantity, launched_quantity=quantity,
+                    production_order_no=f"PO{number}"
+                )
+                for operation in range(operations_per_order):
+                    database.Operation(
+                        order=order, work_center=centers[operation % len(centers)],
+                        operation_number=(operation + 1) * 10, operation_description=f"Operation {operation}",
+                        setup_time=1.0, per_piece_time=2.0, jump_quantity=2, total_quantity=quantity,
+                        allowed_time=10.0
+                    )
+    return seed
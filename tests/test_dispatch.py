@@ -0,0 +1,43 @@
+import random
+import numpy as np
+from app.algorithms.dispatch import MachineDispatcher
+
+def random_dispatchers(rng):
+    """
+    Two identical dispatchers over one work center with random machine availability, so the
+    same batches can be dispatched on each in a different way.
+    """
+    machine_ids = rng.sample(range(1, 50), rng.randint(0, 5))
+    machines = {"WC": [(machine_id, f"M{machine_id}") for machine_id in machine_ids]} if machine_ids else {}
+    available_at = {machine_id: rng.choice([0, rng.randint(0, 60)]) for machine_id in machine_ids}
+    dispatchers = []
+    for _ in range(2):
+        dispatcher = MachineDispatcher(machines, available_at=0)
+        dispatcher.restore("WC", available_at)
+        dispatchers.append(dispatcher)
+    return dispatchers
+
+def machine_state(dispatcher) -> tuple:
+    return sorted(dispatcher._heap("WC")), dict(dispatcher.busy_time), dict(dispatcher.end_times)
+
+def test_dispatch_batches_matches_repeated_dispatch():
+    rng = random.Random(9)
+    for _ in range(3000):
+        batched, single = random_dispatchers(rng)
+        # Several operations in a row, so later ones start from the state earlier ones left
+        for _ in range(rng.randint(1, 3)):
+            ready_at = rng.randint(0, 80)
+            duration = rng.randint(0, 12)
+            count = rng.randint(0, 12)
+            last_duration = rng.choice([None, rng.randint(0, duration)])
+
+            machine_ids, starts, ends = batched.dispatch_batches("WC", ready_at, duration, count, last_duration)
+            expected = [
+                single.dispatch("WC", ready_at, last_duration if number == count - 1 and last_duration is not None else duration)
+                for number in range(count)
+            ]
+
+            assert machine_ids == [machine_id for machine_id, _, _ in expected]
+            assert np.array_equal(starts, np.array([start for _, start, _ in expected], dtype=np.int64))
+            assert np.array_equal(ends, np.array([end for _, _, end in expected], dtype=np.int64))
+            assert machine_state(batched) == machine_state(single)
@@ -0,0 +1,100 @@
+import random
+from datetime import date, datetime
+from app.algorithms.incremental import IncrementalScheduler
+from app.algorithms.plan import PlanOperation
+from app.algorithms.shift_calendar import ShiftCalendar
+
+CALENDAR = ShiftCalendar(date(2026, 1, 5))
+START_TIME = datetime(2026, 1, 5, 10, 30)
+
+def random_plan(rng):
+    """
+    Random machines per work center, a work center without machines among them, and orders
+    whose operations move between the work centers.
+    """
+    work_centers = rng.randint(1, 4)
+    machine_ids = iter(range(1, 100))
+    machines = {}
+    for work_center in range(1, work_centers + 1):
+        count = rng.randint(0, 3)
+        if count:
+            machines[work_center] = [(machine_id, f"M{machine_id}") for machine_id in [next(machine_ids) for _ in range(count)]]
+
+    operations = []
+    operation_ids = iter(rng.sample(range(1, 1000), 60))
+    for order_id in range(1, rng.randint(1, 6) + 1):
+        for number in range(1, rng.randint(1, 4) + 1):
+            operations.append(random_timing(rng, PlanOperation(
+                operation_id=next(operation_ids),
+                order_id=order_id,
+                part_number=f"P{order_id}",
+                work_center_id=rng.randint(1, work_centers),
+                work_center_code="",
+                operation_number=number * 10,
+                operation_description=f"Operation {number}",
+                per_piece_time=0.0,
+                jump_quantity=0,
+                total_quantity=0,
+                actual_time=None,
+                confirmation_number=None,
+            )))
+    operations = [op._replace(work_center_code=f"WC{op.work_center_id}") for op in operations]
+    return operations, machines
+
+def random_timing(rng, op: PlanOperation) -> PlanOperation:
+    """
+    op with random times and quantities, as a confirmation may change them.
+    """
+    total_quantity = rng.randint(0, 8)
+    confirmed = rng.random() < 0.3
+    return op._replace(
+        per_piece_time=rng.choice([0.5, 1.0, 2.5, 30.0, 90.0]),
+        jump_quantity=rng.randint(0, total_quantity),
+        total_quantity=total_quantity,
+        actual_time=rng.uniform(1, 300) if confirmed else None,
+        confirmation_number=f"C{op.operation_id}" if confirmed else None,
+    )
+
+def test_update_operation_matches_full_recompute():
+    rng = random.Random(10)
+    for _ in range(300):
+        operations, machines = random_plan(rng)
+        scheduler = IncrementalScheduler(operations, machines, CALENDAR, START_TIME)
+        for _ in range(5):
+            position = rng.randrange(len(operations))
+            operations[position] = random_timing(rng, operations[position])
+            scheduler.update_operation(operations[position])
+
+            rebuilt = IncrementalScheduler(operations, machines, CALENDAR, START_TIME)
+            for granularity in ("batch", "piece"):
+                assert list(scheduler.iter_rows(granularity)) == list(rebuilt.iter_rows(granularity))
+
+def test_update_operation_reports_the_operations_that_changed():
+    rng = random.Random(11)
+    for _ in range(100):
+        operations, machines = random_plan(rng)
+        scheduler = IncrementalScheduler(operations, machines, CALENDAR, START_TIME)
+        previous = dict(zip([op.operation_id for op in scheduler.sequence], scheduler.batches))
+        position = rng.randrange(len(operations))
+        operations[position] = random_timing(rng, operations[position])
+        changed = scheduler.update_operation(operations[position])
+
+        replaced = [
+            op.operation_id for op, batches in zip(scheduler.sequence, scheduler.batches)
+            if batches is not previous[op.operation_id]
+        ]
+        assert changed == replaced
+
+def test_utilization_follows_updates():
+    rng = random.Random(12)
+    for _ in range(100):
+        operations, machines = random_plan(rng)
+        scheduler = IncrementalScheduler(operations, machines, CALENDAR, START_TIME)
+        assert scheduler.utilization() == scheduler.dispatcher.utilization()
+        for _ in range(3):
+            position = rng.randrange(len(operations))
+            operations[position] = random_timing(rng, operations[position])
+            scheduler.update_operation(operations[position])
+
+        rebuilt = IncrementalScheduler(operations, machines, CALENDAR, START_TIME)
+        assert scheduler.utilization() == rebuilt.dispatcher.utilization()
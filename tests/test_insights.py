@@ -0,0 +1,40 @@
+import logging
+import pytest
+from fastapi import HTTPException
+from pony.orm import db_session, set_sql_debug
+from app.routers.operation import fetch_insight_page, parse_insight_fields
+
+def test_unknown_fields_are_rejected():
+    tables = ["operations", "work_centers"]
+    assert parse_insight_fields("order_id,work_centers.description", tables) == {
+        "operations": {"order_id"}, "work_centers": {"order_id", "description"}
+    }
+    for fields in ["operations.no_such_column", "no_such_column", "work_centers.order_id", "operations."]:
+        with pytest.raises(HTTPException) as error:
+            parse_insight_fields(fields, tables)
+        assert error.value.status_code == 400
+
+def test_pages_select_only_the_requested_fields(database, seed_plan, caplog):
+    seed_plan(database, 4)
+    with db_session:
+        rows, next_cursor = fetch_insight_page("operations", database=database)
+        assert len(rows) == 12 and next_cursor is None
+
+        pages, after = [], None
+        while True:
+            page, after = fetch_insight_page("operations", after, 5, {"work_center_code"}, database)
+            pages += page
+            if after is None:
+                break
+        assert pages == [{key: row[key] for key in ("operation_id", "work_center_code")} for row in rows]
+
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger="pony.orm.sql"):
+            set_sql_debug(True)
+            try:
+                page, _ = fetch_insight_page("operations", None, 5, {"no_such_column"}, database)
+            finally:
+                set_sql_debug(False)
+        assert page == [{"operation_id": row["operation_id"]} for row in rows[:5]]
+        sql = [record.getMessage() for record in caplog.records if record.name == "pony.orm.sql"]
+        assert len(sql) == 1 and "operation_description" not in sql[0]
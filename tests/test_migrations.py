@@ -0,0 +1,36 @@
+from pony.orm import db_session
+from app.database.migrations import apply_indexes, explain_access_paths, missing_indexes, sqlite_unique_index
+
+# Index each access path in ACCESS_PATHS must use
+EXPECTED_INDEXES = {
+    "operations of an order": "idx_operation__order_operation_number",
+    "operations of a work center": "idx_operation__work_center_operation_number",
+    "machines of a work center": "idx_workcentermachine__work_center_status",
+    "order by production order number": "unq_masterorder__production_order_no",
+}
+
+def index_name(database, name: str) -> str:
+    """
+    The name SQLite knows a declared index by: unique constraints are created inside CREATE
+    TABLE, which indexes them under a generated name.
+    """
+    index = next(index for table in database.schema.tables.values() for index in table.indexes.values() if index.name == name)
+    if not index.is_unique:
+        return name
+    with db_session:
+        return sqlite_unique_index(database.get_connection(), index.table.name, [column.name for column in index.columns])
+
+def test_access_paths_use_their_indexes(database):
+    plans = explain_access_paths(database)
+    assert set(plans) == set(EXPECTED_INDEXES)
+    for description, name in EXPECTED_INDEXES.items():
+        assert f"USING INDEX {index_name(database, name)} " in plans[description], f"{description}: {plans[description]}"
+
+def test_apply_indexes_creates_missing_indexes(database):
+    with db_session:
+        database.execute("DROP INDEX idx_operation__work_center_operation_number")
+        assert [index.name for index in missing_indexes(database)] == ["idx_operation__work_center_operation_number"]
+
+    assert apply_indexes(database) == ["idx_operation__work_center_operation_number"]
+    with db_session:
+        assert missing_indexes(database) == []
@@ -0,0 +1,76 @@
+import random
+import re
+from app.ingestion.oarc_parser import parse_oarc_text
+from benchmarks.oarc_parser_benchmark import synthetic_oarc_text
+
+OPERATION_FIELDS = ["Oprn No", "Wc/Plant", "Setup Time", "Per Pc Time", "Jmp Qty", "Tot Qty", "Allowed Time", "Confirm No"]
+
+def expected_fields(index: int, text: str) -> dict:
+    """
+    The fields of a synthetic document, read back from its lines by position.
+    """
+    lines = text.split("\n")
+    header = " ".join(lines[:4]).split()
+    operations = []
+    for number, line in enumerate(lines):
+        if re.fullmatch(r"\d{4} \S+( \S+){6}", line) and lines[number + 1].startswith("1000"):
+            follow = lines[number + 1:number + 3]
+            operations.append({
+                **dict(zip(OPERATION_FIELDS, line.split())),
+                "Plant Number": "1000",
+                "Operation": follow[0][5:] if follow[0] != "1000" else follow[1],
+            })
+    table = lines.index("Item Child Part No Description Qty Per Set UoM Total Qty")
+    raw_materials = []
+    for line in lines[table + 1:]:
+        if line.startswith("SPECIAL NOTE"):
+            break
+        sl_no, child_part_no, *description, qty_per_set, uom, total_qty = line.split()
+        raw_materials.append({
+            "Sl.No": sl_no, "Child Part No": child_part_no, "Description": " ".join(description),
+            "Qty Per Set": qty_per_set, "UoM": uom, "Total Qty": total_qty,
+        })
+    return {
+        "Project Name": f"PROJECT {index}",
+        "Part No": f"PN-{index:05d}",
+        "WBS": f"WBS-{index}",
+        "Sale Order": f"SO-{index}",
+        "Part Desc": f"HOUSING ASSY {index}",
+        "Plant": "1000",
+        "Rtg Seq No": header[header.index("Rtg") + 4],
+        "Sequence No": "0",
+        "Required Qty": header[header.index("Required") + 3],
+        "Launched Qty": header[header.index("Launched") + 3],
+        "Prod Order No": str(100000 + index),
+        "Operations": operations,
+        "Raw Materials": raw_materials,
+    }
+
+def test_parse_synthetic_documents():
+    rng = random.Random(13)
+    for index in range(150):
+        operations = rng.randint(1, 90)  # Past 40 and 80 the table header repeats after a page break
+        text = synthetic_oarc_text(index, operations, rng)
+        data = parse_oarc_text(text)
+        expected = expected_fields(index, text)
+
+        assert len(data["Operations"]) == operations
+        for field in ["Operations", "Raw Materials"]:
+            assert len(data[field]) == len(expected[field])
+        for parsed, wanted in zip(data["Operations"], expected["Operations"]):
+            assert {key: parsed[key] for key in wanted} == wanted
+        assert {key: data[key] for key in expected if key != "Operations"} == {
+            key: value for key, value in expected.items() if key != "Operations"
+        }
+
+        # The verification operation's long text starts with the document details
+        assert data["Operations"][0]["Long Text"].split("\n")[:3] == [
+            "OARC Rev. : 03", "Drawing No. : DRG-1234 Rev. : B", "Raw Material Index Doc No. : RMI-77 Rev. : 2"
+        ]
+        assert data["Document Verification"] == {
+            "OARC Rev": "03", "Raw Material Index Doc": {"Number": "RMI-77", "Revision": "2"}
+        }
+        # Once started, long text collects every later line of an operation, including its
+        # plant number and description lines
+        for operation in data["Operations"][1:]:
+            assert operation["Long Text"].split("\n")[:2] == ["1000", operation["Operation"]]
@@ -0,0 +1,38 @@
+import logging
+from pony.orm import db_session, set_sql_debug
+from app.algorithms.plan import load_plan_snapshot
+from app.algorithms.scheduling import load_scheduling_snapshot
+
+def count_snapshot_queries(database, caplog) -> int:
+    """
+    Number of SQL statements load_plan_snapshot runs on database, in a fresh db_session.
+    """
+    caplog.clear()
+    with db_session, caplog.at_level(logging.INFO, logger="pony.orm.sql"):
+        set_sql_debug(True)
+        try:
+            operations, machines = load_plan_snapshot(database)
+        finally:
+            set_sql_debug(False)
+    assert operations and machines
+    return len([record for record in caplog.records if record.name == "pony.orm.sql"])
+
+def test_snapshot_query_count_does_not_grow_with_rows(database, seed_plan, caplog):
+    seed_plan(database, 10)
+    small = count_snapshot_queries(database, caplog)
+
+    seed_plan(database, 90)
+    with db_session:
+        assert database.Operation.select().count() == 100 * 3
+    assert count_snapshot_queries(database, caplog) == small
+
+def test_scheduling_snapshot_shares_the_machines_of_the_plan_snapshot(database, seed_plan):
+    seed_plan(database, 5)
+    with db_session:
+        database.WorkCenterMachine.select().first().status = "Maintenance"
+        _, machines_by_id = load_plan_snapshot(database)
+        _, machines_by_code = load_scheduling_snapshot(database)
+        codes = {work_center.work_center_id: work_center.work_center_code for work_center in database.WorkCenter.select()}
+
+    assert machines_by_code == {codes[work_center_id]: machines for work_center_id, machines in machines_by_id.items()}
+    assert sum(len(machines) for machines in machines_by_id.values()) == 3 * 2 - 1
@@ -0,0 +1,94 @@
+import random
+from datetime import date, datetime, time, timedelta
+import numpy as np
+from app.algorithms.shift_calendar import ShiftCalendar, MICROSECONDS_PER_MINUTE
+
+ORIGIN = date(2026, 3, 2)
+DAYS = 40
+
+# Shift patterns: a day shift, overnight shifts, back-to-back shifts that merge and overlapping ones
+SHIFT_PATTERNS = [
+    [(time(9), time(17))],
+    [(time(22), time(6))],
+    [(time(6), time(14)), (time(14), time(22))],
+    [(time(6), time(14)), (time(14), time(22)), (time(22), time(6))],
+    [(time(8), time(12)), (time(13), time(17, 30))],
+    [(time(20), time(4)), (time(3), time(9))],
+]
+
+def random_calendar(rng):
+    shifts = rng.choice(SHIFT_PATTERNS)
+    weekend_days = rng.sample(range(7), rng.randint(0, 2))
+    holidays = [ORIGIN + timedelta(days=rng.randint(0, DAYS)) for _ in range(rng.randint(0, 3))]
+    # A short horizon makes the calendar grow while it is used
+    calendar = ShiftCalendar(ORIGIN, shifts, weekend_days, holidays, horizon_days=rng.randint(7, 10))
+    return calendar, working_minutes(shifts, weekend_days, holidays)
+
+def working_minutes(shifts, weekend_days, holidays) -> np.ndarray:
+    """
+    The minutes from midnight of the origin day that are worked, in order: the reference the
+    calendar is checked against. A shift belongs to the day it starts on.
+    """
+    worked = np.zeros((DAYS + 2) * 1440, dtype=bool)
+    for day in range(DAYS + 1):
+        moment = ORIGIN + timedelta(days=day)
+        if moment.weekday() in weekend_days or moment in holidays:
+            continue
+        for start, end in shifts:
+            first = day * 1440 + start.hour * 60 + start.minute
+            last = day * 1440 + end.hour * 60 + end.minute + (1440 if end <= start else 0)
+            worked[first:last] = True
+    return np.flatnonzero(worked[:DAYS * 1440])
+
+def at_minute(minute) -> datetime:
+    return datetime.combine(ORIGIN, time()) + timedelta(minutes=int(minute))
+
+def test_to_working_time_counts_worked_minutes_before():
+    rng = random.Random(8)
+    for _ in range(60):
+        calendar, worked = random_calendar(rng)
+        for minute in [rng.randrange(DAYS * 1440) for _ in range(100)] + [int(worked[0]), int(worked[-1]) + 1]:
+            expected = np.searchsorted(worked, minute) * MICROSECONDS_PER_MINUTE
+            assert calendar.to_working_time(at_minute(minute)) == expected, at_minute(minute)
+        assert calendar.to_working_time(at_minute(-60)) == 0
+
+def test_to_datetime_finds_the_worked_minute():
+    rng = random.Random(9)
+    for _ in range(60):
+        calendar, worked = random_calendar(rng)
+        for count in [0, 1, len(worked) - 1] + [rng.randrange(1, len(worked)) for _ in range(100)]:
+            working_time = count * MICROSECONDS_PER_MINUTE
+            # As a start, a working time on a shift boundary is the start of the next shift;
+            # as an end, it is the end of the shift it closes
+            assert calendar.to_datetime(working_time) == at_minute(worked[count])
+            if count:
+                assert calendar.to_datetime(working_time, end=True) == at_minute(worked[count - 1] + 1)
+
+def test_split_follows_worked_runs():
+    rng = random.Random(10)
+    for _ in range(60):
+        calendar, worked = random_calendar(rng)
+        counts = sorted(rng.randrange(len(worked)) for _ in range(2 * 40))
+        starts = np.array(counts[::2], dtype=np.int64) * MICROSECONDS_PER_MINUTE
+        ends = np.array(counts[1::2], dtype=np.int64) * MICROSECONDS_PER_MINUTE
+        segment_starts, segment_ends, sources = calendar.split(starts, ends)
+        segment_start_times, segment_end_times = calendar.to_datetimes(segment_starts, segment_ends)
+
+        expected = []
+        for source, (first, last) in enumerate(zip(counts[::2], counts[1::2])):
+            if first == last:
+                expected.append((source, first, last))
+                continue
+            # Consecutive worked minutes form one segment; a gap in the worked minutes splits it
+            minutes = worked[first:last]
+            breaks = np.flatnonzero(np.diff(minutes) != 1) + 1
+            for run_start, run_end in zip(np.concatenate([[0], breaks]), np.concatenate([breaks, [len(minutes)]])):
+                expected.append((source, first + run_start, first + run_end))
+
+        assert sources.tolist() == [source for source, _, _ in expected]
+        assert (segment_starts // MICROSECONDS_PER_MINUTE).tolist() == [first for _, first, _ in expected]
+        assert (segment_ends // MICROSECONDS_PER_MINUTE).tolist() == [last for _, _, last in expected]
+        for (_, first, last), start_time, end_time in zip(expected, segment_start_times.tolist(), segment_end_times.tolist()):
+            if first < last:
+                assert start_time == at_minute(worked[first])
+                assert end_time == at_minute(worked[last - 1] + 1)